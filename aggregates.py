@@ -0,0 +1,149 @@
+import os
+import csv
+import json
+import tempfile
+import threading
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent syncs are not serialised across processes.
+    fcntl = None
+
+# Bytes before the watermark used to detect logs rewritten outside the app.
+FINGERPRINT_BYTES = 64
+
+
+def _complete_lines(f, consumed):
+    """Yields decoded lines of a binary file up to the last newline, counting bytes read."""
+    for line in f:
+        if not line.endswith(b"\n"):
+            return
+        consumed[0] += len(line)
+        yield line.decode("utf-8")
+
+
+class CardFrequencyAggregate:
+    """Card draw counts for a CSV log, persisted next to it and kept up to date incrementally.
+
+    Per-card counts are stored in a JSON sidecar file together with a
+    watermark (byte offset, size, mtime and a short
+    fingerprint of the bytes before the offset). `sync` folds in only the
+    rows appended since the watermark; if the log shrank or its contents
+    before the watermark changed, the counts are rebuilt from scratch.
+
+    Syncs are serialised by a thread lock within the process and an
+    exclusive flock on `<stats>.lock` across processes.
+    """
+    def __init__(self, log_path, stats_path=None):
+        self.log_path = log_path
+        self.stats_path = stats_path or log_path + ".stats.json"
+        self.lock_path = self.stats_path + ".lock"
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.cards = Counter()
+        # Identity of the sidecar the counts came from; reloads are skipped while it matches.
+        self._stamp = None
+        self.watermark = {"offset": 0, "size": 0, "mtime_ns": 0, "fingerprint": ""}
+
+    @staticmethod
+    def _file_stamp(st):
+        # Every save replaces the file, so the inode changes even within one mtime tick.
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self):
+        try:
+            stamp = self._file_stamp(os.stat(self.stats_path))
+            if stamp == self._stamp:
+                return
+            with open(self.stats_path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.cards = Counter(state["cards"])
+            self.watermark = state["watermark"]
+            self._stamp = stamp
+        except (OSError, ValueError, KeyError):
+            self._reset()
+
+    def _save(self):
+        state = {"cards": self.cards, "watermark": self.watermark}
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.stats_path) + ".",
+                                        suffix=".tmp", dir=os.path.dirname(self.stats_path) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.stats_path)
+            self._stamp = self._file_stamp(os.stat(self.stats_path))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _fingerprint(f, offset):
+        start = max(offset - FINGERPRINT_BYTES, 0)
+        f.seek(start)
+        return f.read(offset - start).hex()
+
+    def fold_row(self, row):
+        """Adds one history row to the in-memory counts."""
+        self.cards.update(c.strip() for c in row[2].split(",") if c.strip())
+
+    def sync(self):
+        """Brings the counts up to date with the log, reading only new rows when possible.
+
+        Returns a copy of the overall card counts.
+        """
+        if not os.path.isfile(self.log_path):
+            with self._lock:
+                self._reset()
+            return Counter()
+        with self._lock, open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            self._sync_locked()
+            return Counter(self.cards)
+
+    def _sync_locked(self):
+        self._load()
+        if not os.path.isfile(self.log_path):
+            self._reset()
+            return
+        st = os.stat(self.log_path)
+        wm = self.watermark
+        if st.st_size == wm["size"] and st.st_mtime_ns == wm["mtime_ns"]:
+            return
+
+        with open(self.log_path, "rb") as f:
+            offset = wm["offset"]
+            appended = st.st_size > wm["size"] and self._fingerprint(f, offset) == wm["fingerprint"]
+            if not appended:
+                # Truncated, cleared or edited outside the app: full rebuild.
+                self._reset()
+                offset = 0
+            # Stream the new rows; a trailing line without its newline is
+            # still being written and is left for the next sync.
+            f.seek(offset)
+            consumed = [0]
+            reader = csv.reader(_complete_lines(f, consumed))
+            if offset == 0:
+                next(reader, None)
+            for row in reader:
+                if len(row) >= 3:
+                    self.fold_row(row)
+            offset += consumed[0]
+            self.watermark = {
+                "offset": offset,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "fingerprint": self._fingerprint(f, offset),
+            }
+        self._save()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            for path in (self.stats_path, self.lock_path):
+                if os.path.isfile(path):
+                    os.remove(path)
@@ -0,0 +1,261 @@
+import os
+import csv
+import json
+import math
+from itertools import islice
+
+import numpy as np
+
+from config import tarot_cards, full_deck
+from deck import base_card
+from storage import split_cards
+
+WINDOWS = {"day": "datetime64[D]", "week": "datetime64[W]", "month": "datetime64[M]", "year": "datetime64[Y]"}
+CHUNK_SIZE = 100000
+
+
+def _chi2_sf(stat, dof):
+    """Survival function of the chi-square distribution (regularized upper gamma Q(dof/2, stat/2))."""
+    a, x = dof / 2.0, stat / 2.0
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # Series for the lower gamma P(a, x), then Q = 1 - P.
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Continued fraction for Q(a, x) (modified Lentz).
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+class HistoryAnalytics:
+    """Draw statistics over a reading history, computed in bounded memory.
+
+    The history is streamed from the store in chunks; each chunk is turned
+    into columnar arrays (card index per drawn card, reading index, reading
+    timestamp, question id) and folded into running totals with NumPy, so
+    memory depends on the chunk size and deck size, not on the history size.
+    """
+    def __init__(self, window="month", chunk_size=CHUNK_SIZE):
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window: {window} (choose from {', '.join(WINDOWS)})")
+        self.window = window
+        self.chunk_size = chunk_size
+        self.cards = list(full_deck)
+        self._card_index = {card: i for i, card in enumerate(self.cards)}
+        self.counts = np.zeros(len(self.cards), dtype=np.int64)
+        self.reversed_counts = np.zeros(len(self.cards), dtype=np.int64)
+        self.cooccurrence = np.zeros((len(self.cards), len(self.cards)), dtype=np.int64)
+        self.window_counts = {}
+        self.questions = []
+        self._question_index = {}
+        self.question_windows = {}
+        self.readings = 0
+
+    def _index(self, card):
+        index = self._card_index.get(card)
+        if index is None:
+            # Cards outside the standard deck (hand-edited logs) get new columns.
+            index = self._card_index[card] = len(self.cards)
+            self.cards.append(card)
+            n = len(self.cards)
+            self.counts = np.pad(self.counts, (0, 1))
+            self.reversed_counts = np.pad(self.reversed_counts, (0, 1))
+            self.cooccurrence = np.pad(self.cooccurrence, ((0, 1), (0, 1)))
+            self.window_counts = {k: np.pad(v, (0, n - len(v))) for k, v in self.window_counts.items()}
+        return index
+
+    def _question_id(self, question):
+        qid = self._question_index.get(question)
+        if qid is None:
+            qid = self._question_index[question] = len(self.questions)
+            self.questions.append(question)
+        return qid
+
+    def _columns(self, rows):
+        """Converts history rows into columnar arrays."""
+        card_idx, reading_idx, reversed_ = [], [], []
+        for r, row in enumerate(rows):
+            for name in split_cards(row[2]):
+                card = base_card(name)
+                card_idx.append(self._index(card))
+                reading_idx.append(r)
+                reversed_.append(card != name)
+        timestamps = np.array([row[0][:10] for row in rows], dtype="datetime64[D]")
+        question_ids = np.array([self._question_id(row[1]) for row in rows], dtype=np.int32)
+        return (np.array(card_idx, dtype=np.int32), np.array(reading_idx, dtype=np.int32),
+                np.array(reversed_, dtype=bool), timestamps, question_ids)
+
+    def add_rows(self, rows):
+        """Folds one chunk of history rows into the running totals."""
+        if not rows:
+            return
+        card_idx, reading_idx, reversed_, timestamps, question_ids = self._columns(rows)
+        n = len(self.cards)
+        m = len(rows)
+        self.readings += m
+        self.counts += np.bincount(card_idx, minlength=n)
+        self.reversed_counts += np.bincount(card_idx[reversed_], minlength=n)
+
+        # Co-occurrence = incidence.T @ incidence over the chunk's readings.
+        incidence = np.zeros((m, n), dtype=np.float32)
+        incidence[reading_idx, card_idx] = 1
+        co = np.rint(incidence.T @ incidence).astype(np.int64)
+        np.fill_diagonal(co, 0)
+        self.cooccurrence += co
+
+        buckets = timestamps.astype(WINDOWS[self.window])
+        labels, bucket_of_reading = np.unique(buckets, return_inverse=True)
+        per_bucket = np.bincount(bucket_of_reading[reading_idx] * n + card_idx,
+                                 minlength=len(labels) * n).reshape(len(labels), n)
+        for label, counts in zip(labels.astype(str), per_bucket):
+            if label in self.window_counts:
+                self.window_counts[label] += counts
+            else:
+                self.window_counts[label] = counts.astype(np.int64)
+
+        pairs, pair_counts = np.unique(
+            np.stack([question_ids, bucket_of_reading]), axis=1, return_counts=True
+        )
+        for (qid, b), count in zip(pairs.T, pair_counts):
+            trend = self.question_windows.setdefault(self.questions[qid], {})
+            label = str(labels[b])
+            trend[label] = trend.get(label, 0) + int(count)
+
+    def add_store(self, store):
+        """Streams every row of a history store through add_rows in chunks."""
+        rows = store.iter_rows()
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return self
+            self.add_rows(chunk)
+
+    def deck_size(self):
+        """22 if only major arcana were drawn, otherwise the full deck."""
+        drawn = np.nonzero(self.counts)[0]
+        return len(tarot_cards) if drawn.size and drawn.max() < len(tarot_cards) else len(self.cards)
+
+    def chi_square_uniform(self):
+        """Tests the observed draw counts against a uniform draw over the deck."""
+        observed = self.counts[:self.deck_size()].astype(float)
+        total = observed.sum()
+        if not total:
+            return {"statistic": 0.0, "dof": 0, "p_value": 1.0, "draws": 0}
+        expected = total / observed.size
+        stat = float(((observed - expected) ** 2 / expected).sum())
+        dof = observed.size - 1
+        return {"statistic": stat, "dof": dof, "p_value": _chi2_sf(stat, dof), "draws": int(total)}
+
+    def top_pairs(self, limit=10):
+        """Most frequent card pairs as (card, card, count)."""
+        upper = np.triu(self.cooccurrence, 1)
+        flat = np.argsort(upper, axis=None)[::-1][:limit]
+        rows, cols = np.unravel_index(flat, upper.shape)
+        return [(self.cards[r], self.cards[c], int(upper[r, c])) for r, c in zip(rows, cols) if upper[r, c]]
+
+    def frequencies(self):
+        return sorted(
+            ((card, int(count), int(rev)) for card, count, rev in zip(self.cards, self.counts, self.reversed_counts) if count),
+            key=lambda item: -item[1],
+        )
+
+    def to_dict(self):
+        return {
+            "readings": self.readings,
+            "window": self.window,
+            "frequencies": [{"card": c, "count": n, "reversed": r} for c, n, r in self.frequencies()],
+            "chi_square_uniform": self.chi_square_uniform(),
+            "top_pairs": [{"cards": [a, b], "count": n} for a, b, n in self.top_pairs()],
+            "windows": {
+                label: {self.cards[i]: int(n) for i, n in enumerate(counts) if n}
+                for label, counts in sorted(self.window_counts.items())
+            },
+            "question_trends": self.question_windows,
+        }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_csv(self, directory):
+        """Writes frequencies, co-occurrence, per-window and per-question tables as CSV files."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "frequencies.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["card", "count", "reversed"])
+            writer.writerows(self.frequencies())
+        drawn = [i for i, count in enumerate(self.counts) if count]
+        with open(os.path.join(directory, "cooccurrence.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["card"] + [self.cards[i] for i in drawn])
+            for i in drawn:
+                writer.writerow([self.cards[i]] + [int(self.cooccurrence[i, j]) for j in drawn])
+        with open(os.path.join(directory, f"per_{self.window}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([self.window] + [self.cards[i] for i in drawn])
+            for label, counts in sorted(self.window_counts.items()):
+                writer.writerow([label] + [int(counts[i]) for i in drawn])
+        with open(os.path.join(directory, "question_trends.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["question", self.window, "readings"])
+            for question, trend in self.question_windows.items():
+                for label, count in sorted(trend.items()):
+                    writer.writerow([question, label, count])
+
+    def render(self, console, top=10):
+        """Prints the main results as rich tables."""
+        from rich.markup import escape
+        from rich.table import Table
+
+        table = Table(title=f"Card frequencies ({self.readings} readings)")
+        table.add_column("Card")
+        table.add_column("Count", justify="right")
+        table.add_column("Reversed", justify="right")
+        for card, count, rev in self.frequencies()[:top]:
+            table.add_row(escape(card), str(count), str(rev))
+        console.print(table)
+
+        chi = self.chi_square_uniform()
+        console.print(
+            f"Chi-square vs uniform: statistic {chi['statistic']:.2f}, {chi['dof']} dof, "
+            f"p = {chi['p_value']:.4f}" + (" [red](draws look non-uniform)[/red]" if chi["p_value"] < 0.01 else "")
+        )
+
+        table = Table(title="Most frequent card pairs")
+        table.add_column("Cards")
+        table.add_column("Together", justify="right")
+        for a, b, count in self.top_pairs(top):
+            table.add_row(escape(f"{a} + {b}"), str(count))
+        console.print(table)
+
+        table = Table(title=f"Readings per question per {self.window}")
+        labels = sorted(self.window_counts)[-6:]
+        table.add_column("Question")
+        for label in labels:
+            table.add_column(escape(label), justify="right")
+        for question, trend in sorted(self.question_windows.items(), key=lambda item: -sum(item[1].values()))[:top]:
+            table.add_row(escape(question), *(str(trend.get(label, 0)) for label in labels))
+        console.print(table)
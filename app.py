@@ -1,29 +1,77 @@
 import random
-import os
 import openai
-import time
-from dotenv import load_dotenv
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.markup import escape
 
 # Import new classes and config
-from config import questions, ORIGINAL_PROGRESS_PAIRS
+from config import questions, ORIGINAL_PROGRESS_PAIRS, CACHE_ENABLED, STREAM_READINGS, PACING_MODES
+from cache import ReadingCache
 from deck import TarotDeck
 from history import HistoryManager
+from metrics import incr, span, timed
+from pacing import get_pacing
+from prompts import completion_params
+from reading import fetch_reading, load_api_key
 
-# Load environment variables
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+class ReadingInterrupted(Exception):
+    """Raised when a streamed reading stops early; carries the text received so far."""
+    def __init__(self, partial, reason):
+        super().__init__(reason)
+        self.partial = partial
+        self.reason = reason
+
+class PendingReading:
+    """A reading being generated in the background while the draw animation plays."""
+    def __init__(self, app, question, cards):
+        self.question = question
+        self.cards = cards
+        self.cancel = threading.Event()
+        self.text = ""
+        self._listener = None
+        self._lock = threading.Lock()
+        on_text = self._on_text if STREAM_READINGS else None
+        self.future = app.executor.submit(app._get_reading, question, cards, on_text, self.cancel)
+
+    def _on_text(self, text):
+        with self._lock:
+            self.text = text
+            listener = self._listener
+        if listener:
+            listener(text)
+
+    def listen(self, listener):
+        """Sends streamed text to `listener`, starting with whatever arrived already."""
+        with self._lock:
+            self._listener = listener
+            text = self.text
+        if text:
+            listener(text)
+
+    def result(self):
+        """Waits for the reading; Ctrl+C cancels a stream and keeps the partial text."""
+        try:
+            return self.future.result()
+        except KeyboardInterrupt:
+            self.cancel.set()
+            return self.future.result()
 
 class App:
     """The main application class for the Tarot Reading App."""
-    def __init__(self):
+    def __init__(self, pacing=None):
+        load_api_key()
         self.console = Console()
         self.deck = TarotDeck()
         self.history_manager = HistoryManager()
         self.progress_pairs = ORIGINAL_PROGRESS_PAIRS.copy()
+        self.cache = ReadingCache() if CACHE_ENABLED else None
+        self.pacing = get_pacing(pacing)
+        self.executor = ThreadPoolExecutor(max_workers=1)
 
     def _get_progress_pair(self):
         """Return a random progress pair and reset the list when all have been used."""
@@ -33,43 +81,97 @@ class App:
         self.progress_pairs.remove(pair)
         return pair
 
-    def _get_reading(self, question, cards):
-        """Generate a tarot reading using the OpenAI API."""
-        prompt = (
-            f"I have drawn the following tarot cards: {', '.join(cards)}. "
-            f"The focus question is: '{question}'. "
-            "Please provide a fun, insightful, and easy-to-understand tarot reading that interprets these cards."
-        )
+    @timed("reading.get")
+    def _get_reading(self, question, cards, on_text=None, cancel=None):
+        """Generate a tarot reading using the OpenAI API, serving repeated spreads from the cache.
+
+        If `on_text` is given the reading is streamed, and `on_text` is called
+        with the text received so far after every chunk. Setting the `cancel`
+        event stops a stream early.
+        """
+        if self.cache:
+            cached = self.cache.get(question, cards)
+            if cached is not None:
+                incr("cache_hits")
+                return cached
+            incr("cache_misses")
+        incr("api_calls")
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a tarot card reader that provides supportive, concise, and easy-to-understand readings. Focus specifically on answering the user's question using the symbolism of the drawn cards. Provide interpretations that are both meaningful and practical. In 3 sentences or less."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+            with span("reading.api"):
+                if on_text is None:
+                    reading = fetch_reading(question, cards)
+                else:
+                    reading = self._stream_reading(question, cards, on_text, cancel)
+        except ReadingInterrupted as e:
+            # Partial readings are shown and logged but never cached.
+            incr("api_interrupted")
+            partial = e.partial or "No reading was received."
+            return f"{partial}\n\n(Reading interrupted: {e.reason})"
         except Exception as e:
+            incr("api_errors")
             return f"Error generating reading: {e}"
+        if self.cache:
+            self.cache.put(question, cards, reading)
+        return reading
+
+    def _stream_reading(self, question, cards, on_text, cancel=None):
+        """Streams a completion, returning the assembled text."""
+        stream = openai.chat.completions.create(**completion_params(question, cards), stream=True)
+        parts = []
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    raise KeyboardInterrupt
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    on_text("".join(parts))
+        except KeyboardInterrupt:
+            raise ReadingInterrupted("".join(parts).strip(), "cancelled")
+        except Exception as e:
+            if not parts:
+                raise
+            raise ReadingInterrupted("".join(parts).strip(), str(e))
+        finally:
+            stream.close()
+        return "".join(parts).strip()
+
+    def _reading_panel(self, text, title):
+        return Panel(escape(text), title=f"[bold blue]{title}[/bold blue]", border_style="blue", padding=(1, 1))
+
+    def _start_reading(self, question, cards):
+        """Requests the reading in the background so pacing pauses overlap the API call."""
+        return PendingReading(self, question, cards)
+
+    @timed("reading.present")
+    def _present_reading(self, pending, title):
+        """Displays a pending reading, streaming it into a live panel if enabled."""
+        if not STREAM_READINGS:
+            with self.console.status("[bold green]Generating your reading...[/bold green]"):
+                reading = pending.result()
+            self.console.print(self._reading_panel(reading, title))
+            return reading
+
+        placeholder = Panel("[italic green]Generating your reading...[/italic green]",
+                            title=f"[bold blue]{title}[/bold blue]", border_style="blue", padding=(1, 1))
+        with Live(placeholder, console=self.console, refresh_per_second=20) as live:
+            pending.listen(lambda text: live.update(self._reading_panel(text, title)))
+            reading = pending.result()
+            live.update(self._reading_panel(reading, title))
+        return reading
 
     def _perform_card_of_the_day(self):
         """Draws and interprets a single card for the day."""
         self.console.print("\n[bold yellow]Drawing your card of the day...[/bold yellow]")
         drawn_card = self.deck.draw_cards(1)
-        
+        question = "What is my card of the day?"
+        pending = self._start_reading(question, drawn_card)
+
         with self.console.status("[italic green]Drawing a card...[/italic green]"):
-            time.sleep(1)
+            self.pacing.card()
             self.console.print(f"- [bold]{escape(drawn_card[0])}[/bold]")
-            time.sleep(1)
+            self.pacing.card()
 
-        question = "What is my card of the day?"
-        
-        with self.console.status("[bold green]Generating your reading...[/bold green]"):
-            reading = self._get_reading(question, drawn_card)
-        
-        self.console.print(Panel(escape(reading), title="[bold blue]Your Card of the Day[/bold blue]", border_style="blue", padding=(1, 1)))
+        reading = self._present_reading(pending, "Your Card of the Day")
 
         self.history_manager.log_reading(question, drawn_card, reading)
         Prompt.ask("\nPress Enter to return to the main menu...")
@@ -95,24 +197,22 @@ class App:
                 return
 
         drawn_cards = self.deck.draw_cards(3)
+        pending = self._start_reading(selected_question, drawn_cards)
         self.console.print("\n[bold yellow]Drawing 3 cards...[/bold yellow]")
         with self.console.status("[italic green]Drawing cards...[/italic green]"):
             for card in drawn_cards:
                 self.console.print(f"- [bold]{escape(card)}[/bold]")
-                time.sleep(1)
+                self.pacing.card()
 
-        time.sleep(2)
+        self.pacing.reveal()
 
         interpret_msg, consult_msg = self._get_progress_pair()
         with self.console.status(f"[italic green]{escape(interpret_msg)}[/italic green]"):
-            time.sleep(2)
+            self.pacing.progress()
         with self.console.status(f"[italic green]{escape(consult_msg)}[/italic green]"):
-            time.sleep(2)
+            self.pacing.progress()
 
-        with self.console.status("[bold green]Generating your reading...[/bold green]"):
-            reading = self._get_reading(selected_question, drawn_cards)
-        
-        self.console.print(Panel(escape(reading), title="[bold blue]Your Tarot Reading[/bold blue]", border_style="blue", padding=(1, 1)))
+        reading = self._present_reading(pending, "Your Tarot Reading")
 
         self.history_manager.log_reading(selected_question, drawn_cards, reading)
         Prompt.ask("\nPress Enter to return to the main menu...")
@@ -150,5 +250,8 @@ class App:
                 break
 
 if __name__ == "__main__":
-    app = App()
+    parser = argparse.ArgumentParser(description="Terminal Tarot Reading App")
+    parser.add_argument("--pacing", choices=list(PACING_MODES), help="how long to pause for dramatic effect")
+    args = parser.parse_args()
+    app = App(pacing=args.pacing)
     app.run()
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import openai
+from dotenv import load_dotenv
+from rich.console import Console
+
+from cache import ReadingCache
+from config import BATCH_CONCURRENCY, BATCH_RATE_LIMIT, BATCH_MAX_RETRIES, BATCH_PACK_SIZE, CACHE_ENABLED
+from deck import TarotDeck
+from history import HistoryManager
+from metrics import incr
+from prompts import bulk_params, completion_params, parse_bulk, reading_mode
+from reading import ReadingStats
+
+# Errors worth retrying: rate limits, server errors and network failures.
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+class TokenBucket:
+    """Async token bucket allowing `rate` requests per second with bursts up to `capacity`."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BatchReader:
+    """Generates many readings concurrently and logs each one as soon as it finishes.
+
+    With `pack_size` > 1, jobs of the same reading mode are packed into one
+    request answered as JSON; readings missing from a packed answer, or from
+    one that does not parse, are retried as single requests.
+    """
+    def __init__(self, client, history_manager, concurrency=BATCH_CONCURRENCY,
+                 rate=BATCH_RATE_LIMIT, max_retries=BATCH_MAX_RETRIES, backoff=0.5, cache=None,
+                 pack_size=BATCH_PACK_SIZE):
+        self.client = client
+        self.history_manager = history_manager
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate) if rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pack_size = max(1, pack_size)
+        self.stats = ReadingStats()
+
+    async def _create(self, params):
+        """Sends one request, retrying with exponential backoff and jitter."""
+        for attempt in range(self.max_retries + 1):
+            if self.bucket:
+                await self.bucket.acquire()
+            incr("api_calls")
+            try:
+                return await self.client.chat.completions.create(**params)
+            except RETRYABLE_ERRORS:
+                incr("api_errors")
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def _get_reading(self, question, cards):
+        """Requests one reading."""
+        start = time.perf_counter()
+        try:
+            response = await self._create(completion_params(question, cards))
+        except openai.OpenAIError:
+            self.stats.record_failure()
+            raise
+        self.stats.record(time.perf_counter() - start, response.usage)
+        reading = response.choices[0].message.content.strip()
+        if self.cache:
+            self.cache.put(question, cards, reading)
+        return reading
+
+    async def _run_job(self, index, job):
+        async with self.semaphore:
+            try:
+                reading = await self._get_reading(job["question"], job["cards"])
+            except openai.OpenAIError as e:
+                return {"index": index, **job, "error": str(e)}
+        return {"index": index, **job, "reading": reading}
+
+    async def _run_pack(self, pack, mode):
+        """Runs a list of (index, job) pairs as one packed request."""
+        if len(pack) == 1:
+            return [await self._run_job(*pack[0])]
+        jobs = dict(pack)
+        readings = {}
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self._create(bulk_params(
+                    [(index, job["question"], job["cards"]) for index, job in pack], mode
+                ))
+                readings = parse_bulk(response.choices[0].message.content, list(jobs))
+            except (openai.OpenAIError, ValueError):
+                # Every job is retried on its own below; only those count as failures.
+                self.stats.requests += 1
+            else:
+                self.stats.record(time.perf_counter() - start, response.usage, len(readings))
+        results = []
+        for index, reading in readings.items():
+            if self.cache:
+                self.cache.put(jobs[index]["question"], jobs[index]["cards"], reading)
+            results.append({"index": index, **jobs[index], "reading": reading})
+        missing = [(index, job) for index, job in pack if index not in readings]
+        self.stats.fallbacks += len(missing)
+        results += await asyncio.gather(*(self._run_job(index, job) for index, job in missing))
+        return results
+
+    def _packs(self, jobs):
+        """Answers cached jobs directly and groups the rest into packs per reading mode."""
+        cached, packs, open_packs = [], [], {}
+        for index, job in enumerate(jobs):
+            reading = self.cache.get(job["question"], job["cards"]) if self.cache else None
+            if reading is not None:
+                cached.append({"index": index, **job, "reading": reading})
+                continue
+            mode = reading_mode(job["cards"])
+            pack = open_packs.setdefault(mode, [])
+            pack.append((index, job))
+            if len(pack) == self.pack_size:
+                packs.append((open_packs.pop(mode), mode))
+        packs += [(pack, mode) for mode, pack in open_packs.items()]
+        return cached, packs
+
+    async def run(self, jobs):
+        """Yields a result dict per job in completion order, logging successful readings."""
+        cached, packs = self._packs(jobs)
+        tasks = [asyncio.create_task(self._run_pack(pack, mode)) for pack, mode in packs]
+        try:
+            for result in cached:
+                self.history_manager.log_reading(result["question"], result["cards"], result["reading"])
+                yield result
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    if "reading" in result:
+                        self.history_manager.log_reading(result["question"], result["cards"], result["reading"])
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def load_jobs(path, deck=None):
+    """Reads one JSON job per line: {"question": ..., "cards": [...]}.
+
+    Jobs without "cards" get a fresh draw of "num_cards" (default 3).
+    """
+    deck = deck or TarotDeck()
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            if "question" not in job:
+                raise ValueError(f"{path}:{line_number}: job has no question")
+            cards = job.get("cards") or deck.draw_cards(job.get("num_cards", 3))
+            jobs.append({"question": job["question"], "cards": list(cards)})
+    return jobs
+
+
+async def run_batch(jobs, args, console):
+    client = openai.AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY") or ("stub" if args.base_url else None),
+        base_url=args.base_url,
+        max_retries=0,
+        timeout=args.timeout,
+    )
+    cache = ReadingCache() if CACHE_ENABLED and not args.no_cache else None
+    reader = BatchReader(client, HistoryManager(), args.concurrency, args.rate, args.max_retries,
+                         cache=cache, pack_size=args.pack)
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    succeeded = failed = 0
+    start = time.perf_counter()
+    try:
+        async for result in reader.run(jobs):
+            if "reading" in result:
+                succeeded += 1
+            else:
+                failed += 1
+                console.print(f"[red]Job {result['index']} failed: {result['error']}[/red]")
+            if out:
+                out.write(json.dumps(result) + "\n")
+    finally:
+        if out:
+            out.close()
+        await client.close()
+    elapsed = time.perf_counter() - start
+    console.print(
+        f"[green]{succeeded} readings generated[/green], [red]{failed} failed[/red] "
+        f"in {elapsed:.1f}s ({len(jobs) / elapsed if elapsed else 0:.1f} jobs/s)"
+    )
+    stats = reader.stats.summary()
+    console.print(
+        f"API: {stats['requests']} requests, p50 {stats['latency_p50_ms']} ms / p90 {stats['latency_p90_ms']} ms "
+        f"per reading, {stats['tokens_per_reading']} tokens per reading, "
+        f"failure rate {stats['failure_rate']:.1%}, {stats['fallbacks']} single-request fallbacks"
+    )
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+    if cache:
+        console.print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate tarot readings in bulk from a JSONL job file.")
+    parser.add_argument("jobs", help="JSONL file with one {\"question\", \"cards\"} job per line")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=BATCH_RATE_LIMIT, help="maximum requests per second (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=BATCH_MAX_RETRIES, help="retries on 429/5xx/connection errors")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="OpenAI-compatible endpoint, e.g. a local fake_openai.py")
+    parser.add_argument("--pack", type=int, default=BATCH_PACK_SIZE, help="readings packed into one request (1 = no packing)")
+    parser.add_argument("--no-cache", action="store_true", help="always call the API instead of the reading cache")
+    parser.add_argument("--stats", help="write latency, token and failure statistics as JSON to this file")
+    parser.add_argument("--output", help="also write every result as JSONL to this file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    console = Console()
+    jobs = load_jobs(args.jobs)
+    console.print(f"[bold]Running {len(jobs)} reading jobs with concurrency {args.concurrency}...[/bold]")
+    failed = asyncio.run(run_batch(jobs, args, console))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
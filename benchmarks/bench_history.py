@@ -0,0 +1,150 @@
+"""History and reading-flow benchmarks with JSON output.
+
+Generates a synthetic history (see synthetic.py) in a scratch directory and
+times each operation in a fresh subprocess so peak RSS is reported per step:
+
+    python benchmarks/bench_history.py --rows 10k
+    python benchmarks/bench_history.py --rows 1M --backend sqlite --output bench.json
+
+Interactive views run with Prompt.ask patched and console output discarded.
+The reading flow uses a mocked _get_reading, so no API calls are made.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import subprocess
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# step name -> prompt answers fed to Prompt.ask
+SEARCHES = {
+    "search_date": ["date", "2024-03-1", ""],
+    "search_question": ["question", "career", ""],
+    "search_card": ["card", "star", ""],
+    "search_keyword": ["keyword", '"new beginnings" courage', "moon", "2024-02", "2024-06", "q", ""],
+}
+STEPS = ["view_history_first_page", "show_card_frequency_cold", "show_card_frequency_warm",
+         *SEARCHES, "log_reading", "reading_flow"]
+
+
+def _quiet(manager):
+    from rich.console import Console
+    manager.console = Console(file=io.StringIO(), width=100)
+    return manager
+
+
+def _timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - start
+
+
+def run_step(step, ops):
+    """Runs one benchmark step in this process and returns its measurements."""
+    from history import HistoryManager
+
+    result = {}
+    if step == "view_history_first_page":
+        manager = _quiet(HistoryManager())
+        with mock.patch("history.Prompt.ask", side_effect=["q", ""]):
+            result["seconds"] = _timed(manager.view_history)
+    elif step.startswith("show_card_frequency"):
+        if step.endswith("warm"):
+            _quiet(HistoryManager()).store.card_frequency()
+        manager = _quiet(HistoryManager())
+        with mock.patch("history.Prompt.ask", return_value=""):
+            result["seconds"] = _timed(manager.show_card_frequency)
+    elif step in SEARCHES:
+        manager = _quiet(HistoryManager())
+        with mock.patch("history.Prompt.ask", side_effect=SEARCHES[step]):
+            result["seconds"] = _timed(manager.search_history)
+    elif step == "log_reading":
+        manager = _quiet(HistoryManager())
+        seconds = _timed(lambda: manager.log_reading(
+            "What is my card of the day?", ["The Star"], "A short benchmark reading."), ops)
+        result.update(seconds=seconds, ops=ops, ops_per_sec=round(ops / seconds, 1))
+    elif step == "reading_flow":
+        from app import App
+        app = App(pacing="zero")
+        app.cache = None
+        app.console = _quiet(app.history_manager).console
+        with mock.patch("app.STREAM_READINGS", False), \
+                mock.patch.object(App, "_get_reading", return_value="A mocked reading."), \
+                mock.patch("app.Prompt.ask", side_effect=["1", ""] * ops):
+            seconds = _timed(app._perform_new_reading, ops)
+        app.executor.shutdown()
+        result.update(seconds=seconds, ops=ops, ops_per_sec=round(ops / seconds, 1))
+    else:
+        raise ValueError(f"Unknown step: {step}")
+    result["seconds"] = round(result["seconds"], 6)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history operations on a synthetic log.")
+    parser.add_argument("--rows", default="10k", help="history size, e.g. 10k, 1M, 10M")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--ops", type=int, default=200, help="iterations for throughput steps")
+    parser.add_argument("--steps", nargs="+", choices=STEPS, default=STEPS)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    parser.add_argument("--step", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.step:
+        print(json.dumps(run_step(args.step, args.ops)))
+        return
+
+    from benchmarks.synthetic import parse_size, write_csv
+    from config import HISTORY_CSV_PATH, HISTORY_DB_PATH
+    from storage import SQLiteHistoryStore
+
+    rows = parse_size(args.rows)
+    workdir = tempfile.mkdtemp(prefix="tarot-bench-")
+    report = {"rows": rows, "backend": args.backend, "python": sys.version.split()[0], "results": {}}
+    try:
+        start = time.perf_counter()
+        write_csv(os.path.join(workdir, HISTORY_CSV_PATH), rows)
+        if args.backend == "sqlite":
+            store = SQLiteHistoryStore(os.path.join(workdir, HISTORY_DB_PATH))
+            store.import_csv(os.path.join(workdir, HISTORY_CSV_PATH))
+            store.close()
+        report["generate_seconds"] = round(time.perf_counter() - start, 3)
+
+        env = dict(os.environ, PYTHONPATH=ROOT, TAROT_HISTORY_BACKEND=args.backend)
+        for step in args.steps:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--step", step, "--ops", str(args.ops)],
+                cwd=workdir, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                report["results"][step] = {"error": proc.stderr.strip().splitlines()[-1]}
+                continue
+            report["results"][step] = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        if args.keep:
+            report["workdir"] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
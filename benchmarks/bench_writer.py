@@ -0,0 +1,98 @@
+"""Sustained append rate of LogWriter with several processes sharing one log.
+
+    python benchmarks/bench_writer.py --processes 4 --rows 5000 --output writer.json
+
+Each mode runs the writers concurrently against a fresh log, then checks that
+every row arrived intact and the header was written once.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from log_writer import LogWriter
+from storage import HEADER
+
+# mode name -> (buffer_rows, journal)
+MODES = {
+    "unbuffered": (1, False),
+    "buffered": (32, False),
+    "unbuffered_journal": (1, True),
+    "buffered_journal": (32, True),
+}
+
+
+def _writer(path, rows, buffer_rows, journal, start, worker):
+    writer = LogWriter(path, HEADER, buffer_rows=buffer_rows, flush_interval=0, journal=journal)
+    reading = "The cards suggest patience.\nTrust the journey. " * 4
+    start.wait()
+    for i in range(rows):
+        writer.write(["2025-01-01 00:00:00", f"worker {worker} row {i}", "The Star, The Moon, The Sun", reading])
+    writer.close()
+
+
+def _verify(path, processes, rows):
+    with open(path, newline="", encoding="utf-8") as f:
+        parsed = list(csv.reader(f))
+    body = parsed[1:]
+    return {
+        "header_ok": parsed[0] == HEADER and HEADER not in body,
+        "rows_ok": len(body) == processes * rows and all(len(r) == 4 for r in body),
+        "rows_written": len(body),
+    }
+
+
+def run_mode(workdir, mode, processes, rows):
+    buffer_rows, journal = MODES[mode]
+    path = os.path.join(workdir, f"{mode}.csv")
+    start = multiprocessing.Event()
+    procs = [
+        multiprocessing.Process(target=_writer, args=(path, rows, buffer_rows, journal, start, w))
+        for w in range(processes)
+    ]
+    for p in procs:
+        p.start()
+    t0 = time.perf_counter()
+    start.set()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        "buffer_rows": buffer_rows,
+        "journal": journal,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(processes * rows / elapsed, 1),
+        **_verify(path, processes, rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent LogWriter append throughput.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=2000, help="rows written by each process")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="tarot-writer-")
+    try:
+        results = {mode: run_mode(workdir, mode, args.processes, args.rows) for mode in args.modes}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = json.dumps({"processes": args.processes, "rows_per_process": args.rows, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cold-start benchmark for cli.py using `python -X importtime`.
+
+Runs each command several times in a scratch directory, reports the median
+wall time and total import time, and fails if a command goes over its budget
+or imports a module it should not need.
+
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+# command args, wall-time budget in ms, modules that must not be imported
+COMMANDS = [
+    (["stats", "--json"], 150, ["openai", "rich", "dotenv", "numpy"]),
+    (["history", "list", "--json"], 150, ["openai", "rich", "dotenv", "numpy"]),
+    (["history", "search", "card", "Star", "--json"], 150, ["openai", "rich", "dotenv", "numpy"]),
+    (["draw", "--no-reading", "--json"], 150, ["openai", "rich", "dotenv"]),
+]
+
+
+def parse_importtime(stderr):
+    """Returns {top-level module: cumulative microseconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_command(args, cwd):
+    cmd = [sys.executable, "-X", "importtime", CLI] + args
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {proc.stderr[-500:]}")
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cli.py cold-start time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="tarot-startup-")
+    results = []
+    failed = False
+    try:
+        # A small history so the commands do real work.
+        seed = (
+            "from storage import create_store, format_timestamp\n"
+            "store = create_store()\n"
+            "for i in range(100):\n"
+            "    store.append(format_timestamp(), 'What is next?', ['The Star', 'The Moon', 'The Sun'], 'A reading.')\n"
+        )
+        subprocess.run([sys.executable, "-c", seed], cwd=workdir, check=True,
+                       env=dict(os.environ, PYTHONPATH=ROOT))
+        for cmd_args, budget_ms, forbidden in COMMANDS:
+            walls, imports = [], []
+            for _ in range(args.runs):
+                wall_ms, modules = run_command(cmd_args, workdir)
+                walls.append(wall_ms)
+                imports.append(sum(modules.values()) / 1000)
+            leaked = sorted(m for m in modules if m.split(".")[0] in forbidden)
+            median_ms = statistics.median(walls)
+            ok = median_ms <= budget_ms and not leaked
+            failed = failed or not ok
+            results.append({
+                "command": " ".join(cmd_args),
+                "median_wall_ms": round(median_ms, 1),
+                "median_import_ms": round(statistics.median(imports), 1),
+                "budget_ms": budget_ms,
+                "forbidden_imports": leaked,
+                "ok": ok,
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.dumps({"python": sys.version.split()[0], "runs": args.runs, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
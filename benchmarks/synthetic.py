@@ -0,0 +1,71 @@
+"""Generates synthetic tarot_readings_log.csv files for benchmarks.
+
+    python benchmarks/synthetic.py --rows 1M --output tarot_readings_log.csv
+    python benchmarks/synthetic.py --rows 10k --sqlite tarot_readings.db
+"""
+import os
+import sys
+import csv
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import tarot_cards, questions
+from storage import HEADER
+
+READING_WORDS = (
+    "the cards suggest a season of growth change patience courage balance renewal "
+    "trust your intuition embrace new beginnings release old patterns focus energy "
+    "on relationships career healing creativity abundance clarity reflection journey"
+).split()
+
+
+def parse_size(text):
+    """Parses row counts such as 10000, 10k or 1M."""
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def synthetic_rows(count, seed=0, start=datetime(2024, 1, 1)):
+    """Yields `count` history rows with increasing timestamps, built from the real cards and questions."""
+    rng = random.Random(seed)
+    when = start
+    for _ in range(count):
+        when += timedelta(seconds=rng.randint(1, 600))
+        num_cards = 1 if rng.random() < 0.3 else 3
+        question = "What is my card of the day?" if num_cards == 1 else rng.choice(questions)
+        cards = rng.sample(tarot_cards, num_cards)
+        reading = " ".join(rng.choices(READING_WORDS, k=rng.randint(25, 45))).capitalize() + "."
+        yield [when.strftime("%Y-%m-%d %H:%M:%S"), question, ", ".join(cards), reading]
+
+
+def write_csv(path, count, seed=0):
+    with open(path, mode="w", newline='', encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(synthetic_rows(count, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic reading history.")
+    parser.add_argument("--rows", default="10k", help="number of rows, e.g. 10k, 1M, 10M")
+    parser.add_argument("--output", default="tarot_readings_log.csv")
+    parser.add_argument("--sqlite", help="also import the rows into this SQLite history database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_csv(args.output, parse_size(args.rows), args.seed)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    if args.sqlite:
+        from storage import SQLiteHistoryStore
+        store = SQLiteHistoryStore(args.sqlite)
+        count = store.import_csv(args.output)
+        store.close()
+        print(f"Imported {count} rows into {args.sqlite}")
+
+
+if __name__ == "__main__":
+    main()
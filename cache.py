@@ -0,0 +1,158 @@
+import json
+import time
+import random
+import sqlite3
+import hashlib
+
+from config import CACHE_PATH, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, CACHE_VARIETY
+from prompts import completion_params
+
+
+def normalize_question(question):
+    """Lower-cases and collapses whitespace so trivially different questions share a key."""
+    return " ".join(question.casefold().split())
+
+
+def cache_key(question, cards):
+    """Hashes the request the reading would be made with; card order does not matter.
+
+    The key covers the mode's model, prompts, token budget and temperature,
+    so editing the templates or READING_MODES stops serving older readings.
+    """
+    params = completion_params(normalize_question(question), sorted(cards))
+    payload = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReadingCache:
+    """Persistent cache of readings keyed on the effective request (see `cache_key`).
+
+    Up to `variety` distinct readings are kept per key. Until a key has that
+    many, lookups miss so a fresh reading gets generated and added; after
+    that a random stored reading is served. Keys expire after `ttl` seconds
+    and the least recently used keys are evicted beyond `max_entries`.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache_keys (
+            key TEXT PRIMARY KEY,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_keys_last_access ON cache_keys (last_access);
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT NOT NULL REFERENCES cache_keys (key),
+            reading TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_key ON cache_entries (key, created);
+        CREATE TABLE IF NOT EXISTS cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES,
+                 variety=CACHE_VARIETY):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variety = max(1, variety)
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        # (question, cards, key) of the last lookup: a miss is usually followed by a put.
+        self._last_key = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            # Readings are fetched on a background thread; calls are never concurrent.
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def _key(self, question, cards):
+        if self._last_key is None or self._last_key[:2] != (question, list(cards)):
+            self._last_key = (question, list(cards), cache_key(question, cards))
+        return self._last_key[2]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _count(self, name):
+        if name == "hits":
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.conn.execute(
+            "INSERT INTO cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, question, cards):
+        """Returns a cached reading, or None if a new one should be generated."""
+        key = self._key(question, cards)
+        now = time.time()
+        with self.conn:
+            if self.ttl:
+                self.conn.execute(
+                    "DELETE FROM cache_entries WHERE key = ? AND created < ?", (key, now - self.ttl)
+                )
+            readings = [r for (r,) in self.conn.execute(
+                "SELECT reading FROM cache_entries WHERE key = ?", (key,)
+            )]
+            if len(readings) < self.variety:
+                self._count("misses")
+                return None
+            self.conn.execute("UPDATE cache_keys SET last_access = ? WHERE key = ?", (now, key))
+            self._count("hits")
+        return random.choice(readings)
+
+    def put(self, question, cards, reading):
+        """Stores a new reading for the key, keeping at most `variety` of them."""
+        key = self._key(question, cards)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO cache_keys (key, last_access) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET last_access = excluded.last_access",
+                (key, now),
+            )
+            self.conn.execute(
+                "INSERT INTO cache_entries (key, reading, created) VALUES (?, ?, ?)", (key, reading, now)
+            )
+            self.conn.execute(
+                "DELETE FROM cache_entries WHERE key = ? AND rowid NOT IN ("
+                "SELECT rowid FROM cache_entries WHERE key = ? ORDER BY created DESC LIMIT ?)",
+                (key, key, self.variety),
+            )
+            self._evict()
+
+    def _evict(self):
+        excess = self.conn.execute("SELECT COUNT(*) FROM cache_keys").fetchone()[0] - self.max_entries
+        if excess > 0:
+            stale = self.conn.execute(
+                "SELECT key FROM cache_keys ORDER BY last_access LIMIT ?", (excess,)
+            ).fetchall()
+            self.conn.executemany("DELETE FROM cache_entries WHERE key = ?", stale)
+            self.conn.executemany("DELETE FROM cache_keys WHERE key = ?", stale)
+
+    def stats(self):
+        """Returns lifetime hit/miss counters and the number of cached keys and readings."""
+        stats = dict(self.conn.execute("SELECT name, value FROM cache_stats").fetchall())
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "keys": self.conn.execute("SELECT COUNT(*) FROM cache_keys").fetchone()[0],
+            "readings": self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0],
+        }
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM cache_entries")
+            self.conn.execute("DELETE FROM cache_keys")
+            self.conn.execute("DELETE FROM cache_stats")
+        self.hits = self.misses = 0
@@ -0,0 +1,269 @@
+"""Non-interactive command line for scripts and cron jobs.
+
+    python cli.py draw --cards 3 --question "What should I focus on?" --json
+    python cli.py history list --page 1
+    python cli.py history search card "The Star"
+    python cli.py history find "new beginnings" --card Star --from 2025-01 --to 2025-06
+    python cli.py stats --json
+    python cli.py simulate --deck full --spreads 1000000
+    python cli.py analytics --window week --json analytics.json --csv analytics/
+
+Heavy dependencies are imported only by the commands that need them:
+`stats` and `history` never import openai, rich or dotenv, and `draw`
+imports openai only when a reading is requested.
+"""
+import sys
+import json
+import argparse
+
+
+def draw(num_cards=3, question=None, with_reading=True, log=True, deck_options=None):
+    """Draws cards and optionally generates and logs a reading. Returns a result dict."""
+    from deck import TarotDeck
+
+    cards = TarotDeck(**(deck_options or {})).draw_cards(num_cards)
+    result = {"question": question, "cards": cards}
+    if not with_reading:
+        return result
+
+    from config import CACHE_ENABLED
+    from reading import fetch_reading, load_api_key
+
+    if question is None:
+        question = "What is my card of the day?" if num_cards == 1 else "What do the cards have to say?"
+        result["question"] = question
+    cache = None
+    if CACHE_ENABLED:
+        from cache import ReadingCache
+        cache = ReadingCache()
+    reading = cache.get(question, cards) if cache else None
+    if reading is None:
+        load_api_key()
+        reading = fetch_reading(question, cards)
+        if cache:
+            cache.put(question, cards, reading)
+    result["reading"] = reading
+    if log:
+        from storage import create_store, format_timestamp
+        create_store().append(format_timestamp(), question, cards, reading)
+    return result
+
+
+def history_page(page=1, page_size=5):
+    """Returns one page of history rows (1-based), newest first."""
+    from storage import create_store
+
+    store = create_store()
+    if not store.exists():
+        return {"page": page, "rows": [], "has_next": False}
+    history = store.read_page(page - 1, page_size)
+    return {"page": page, "rows": [_row_dict(r) for r in history.rows], "has_next": history.has_next}
+
+
+def history_search(filter_type, term=""):
+    """Returns history rows matching a date, question or card substring."""
+    from storage import create_store
+
+    store = create_store()
+    if not store.exists():
+        return []
+    return [_row_dict(r) for r in store.search(filter_type, term)]
+
+
+def history_query(keywords="", card="", date_from="", date_to="", page=1, page_size=10):
+    """Ranked keyword search combined with card and date range filters (1-based pages)."""
+    from storage import create_store
+
+    store = create_store()
+    if not store.exists():
+        return {"page": page, "total": 0, "capped": False, "rows": []}
+    results = store.query(keywords, card, date_from, date_to, page - 1, page_size)
+    return {"page": page, "total": results.total, "capped": results.capped,
+            "rows": [_row_dict(r) for r in results.rows]}
+
+
+def stats():
+    """Returns (card, count) pairs, most drawn first."""
+    from storage import create_store
+
+    store = create_store()
+    if not store.exists():
+        return []
+    return [list(pair) for pair in store.card_frequency()]
+
+
+def simulate(n_spreads, k=3, deck_options=None):
+    """Monte Carlo draw frequencies per card: {card: share of all drawn cards}."""
+    import numpy as np
+    from deck import TarotDeck
+
+    deck = TarotDeck(**(deck_options or {}))
+    indices, _ = deck.draw_many(n_spreads, k)
+    counts = np.bincount(indices.ravel(), minlength=len(deck.cards))
+    return {card: int(count) / indices.size for card, count in zip(deck.cards, counts)}
+
+
+def analytics(window="month", chunk_size=None):
+    """Streams the history into a HistoryAnalytics (needs NumPy)."""
+    from analytics import HistoryAnalytics, CHUNK_SIZE
+    from storage import create_store
+
+    result = HistoryAnalytics(window, chunk_size or CHUNK_SIZE)
+    store = create_store()
+    if store.exists():
+        result.add_store(store)
+    return result
+
+
+def _deck_options(args):
+    """Deck options set on the command line; the rest fall back to config.py."""
+    options = {}
+    if args.deck:
+        options["variant"] = args.deck
+    if args.reversed is not None:
+        options["reversals"] = args.reversed
+    if args.seed is not None:
+        options["seed"] = args.seed
+    return options
+
+
+def _row_dict(row):
+    return {"datetime": row[0], "question": row[1], "cards": row[2], "reading": row[3]}
+
+
+def _print_rows(rows):
+    for row in rows:
+        print(f"Date: {row['datetime']}")
+        print(f"Question: {row['question']}")
+        print(f"Cards: {row['cards']}")
+        print(f"Reading: {row['reading']}")
+        print("-" * 20)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tarot", description="Tarot readings from the command line.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("draw", help="draw cards and get a reading")
+    p.add_argument("--cards", type=int, default=3, help="number of cards to draw")
+    p.add_argument("--question", help="focus question for the reading")
+    p.add_argument("--no-reading", action="store_true", help="only draw the cards")
+    p.add_argument("--no-log", action="store_true", help="do not save the reading to history")
+    p.add_argument("--json", action="store_true", help="print JSON")
+    for p in (p, sub.add_parser("simulate", help="Monte Carlo draw frequencies (needs NumPy)")):
+        p.add_argument("--deck", choices=["major", "full"], help="22 major arcana or all 78 cards")
+        p.add_argument("--reversed", dest="reversed", action="store_const", const=True,
+                       help="allow reversed cards (default: ALLOW_REVERSALS in config.py)")
+        p.add_argument("--no-reversed", dest="reversed", action="store_const", const=False,
+                       help="upright cards only")
+        p.add_argument("--seed", type=int, help="seed for reproducible draws")
+    p.add_argument("--spreads", type=int, default=100000, help="number of spreads to simulate")
+    p.add_argument("--cards", type=int, default=3, help="cards per spread")
+    p.add_argument("--json", action="store_true", help="print JSON")
+
+    p = sub.add_parser("history", help="browse or search reading history")
+    hist = p.add_subparsers(dest="history_command", required=True)
+    h = hist.add_parser("list", help="show a page of readings, newest first")
+    h.add_argument("--page", type=int, default=1)
+    h.add_argument("--page-size", type=int, default=5)
+    h.add_argument("--json", action="store_true", help="print JSON")
+    h = hist.add_parser("search", help="search readings by date, question or card")
+    h.add_argument("filter_type", choices=["date", "question", "card", "all"])
+    h.add_argument("term", nargs="?", default="")
+    h.add_argument("--json", action="store_true", help="print JSON")
+    h = hist.add_parser("find", help="ranked keyword search with card and date filters")
+    h.add_argument("keywords", nargs="?", default="", help='keywords; "quote" phrases')
+    h.add_argument("--card", default="")
+    h.add_argument("--from", dest="date_from", default="", help="YYYY-MM-DD or a prefix such as 2025-08")
+    h.add_argument("--to", dest="date_to", default="", help="YYYY-MM-DD or a prefix, inclusive")
+    h.add_argument("--page", type=int, default=1)
+    h.add_argument("--page-size", type=int, default=10)
+    h.add_argument("--json", action="store_true", help="print JSON")
+
+    p = sub.add_parser("stats", help="card draw frequencies")
+    p.add_argument("--top", type=int, help="only show the N most drawn cards")
+    p.add_argument("--json", action="store_true", help="print JSON")
+
+    p = sub.add_parser("analytics", help="co-occurrence, trends and uniformity test (needs NumPy)")
+    p.add_argument("--window", choices=["day", "week", "month", "year"], default="month")
+    p.add_argument("--chunk-size", type=int, help="history rows per chunk")
+    p.add_argument("--top", type=int, default=10, help="rows per table")
+    p.add_argument("--json", metavar="FILE", help="also write the full results as JSON ('-' for stdout)")
+    p.add_argument("--csv", metavar="DIR", help="also write the tables as CSV files")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "draw":
+        try:
+            result = draw(args.cards, args.question, not args.no_reading, not args.no_log, _deck_options(args))
+        except ValueError as e:
+            parser.error(str(e))
+        if args.json:
+            print(json.dumps(result))
+        else:
+            for card in result["cards"]:
+                print(f"- {card}")
+            if "reading" in result:
+                print(f"\n{result['reading']}")
+    elif args.command == "history":
+        if args.history_command == "list":
+            result = history_page(args.page, args.page_size)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"Page {result['page']}")
+                _print_rows(result["rows"])
+        elif args.history_command == "find":
+            result = history_query(args.keywords, args.card, args.date_from, args.date_to,
+                                   args.page, args.page_size)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"Found {result['total']}{'+' if result['capped'] else ''} matching readings (page {result['page']}):")
+                _print_rows(result["rows"])
+        else:
+            rows = history_search(args.filter_type, args.term)
+            if args.json:
+                print(json.dumps(rows))
+            else:
+                print(f"Found {len(rows)} matching readings:")
+                _print_rows(rows)
+    elif args.command == "simulate":
+        try:
+            shares = simulate(args.spreads, args.cards, _deck_options(args))
+        except ValueError as e:
+            parser.error(str(e))
+        if args.json:
+            print(json.dumps(shares))
+        else:
+            width = max(len(card) for card in shares)
+            for card, share in sorted(shares.items(), key=lambda item: -item[1]):
+                print(f"{card.ljust(width)} | {share:.4%}")
+    elif args.command == "stats":
+        freq = stats()[:args.top] if args.top else stats()
+        if args.json:
+            print(json.dumps(dict(freq)))
+        else:
+            width = max((len(card) for card, _ in freq), default=4)
+            for card, count in freq:
+                print(f"{card.ljust(width)} | {str(count).rjust(5)}")
+    elif args.command == "analytics":
+        result = analytics(args.window, args.chunk_size)
+        if args.csv:
+            result.export_csv(args.csv)
+        if args.json == "-":
+            print(json.dumps(result.to_dict()))
+        else:
+            if args.json:
+                result.export_json(args.json)
+            from rich.console import Console
+            result.render(Console(), args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
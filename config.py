@@ -6,6 +6,21 @@ tarot_cards = [
     "The Devil", "The Tower", "The Star", "The Moon", "The Sun", "Judgement", "The World"
 ]
 
+# The 56 minor arcana, for the full 78-card deck
+SUITS = ["Wands", "Cups", "Swords", "Pentacles"]
+RANKS = ["Ace", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten",
+         "Page", "Knight", "Queen", "King"]
+minor_arcana = [f"{rank} of {suit}" for suit in SUITS for rank in RANKS]
+full_deck = tarot_cards + minor_arcana
+
+# Deck used for readings: "major" (22 major arcana) or "full" (all 78 cards).
+# With ALLOW_REVERSALS each drawn card is upside down with REVERSAL_PROBABILITY.
+# Set DECK_SEED to an integer for reproducible draws.
+DECK_VARIANT = "major"
+ALLOW_REVERSALS = False
+REVERSAL_PROBABILITY = 0.5
+DECK_SEED = None
+
 # List of 10 potential focus questions
 questions = [
     "What's the general energy around me right now?",
@@ -33,3 +48,101 @@ ORIGINAL_PROGRESS_PAIRS = [
     ("Sifting through symbolism...", "Hearing whispers from beyond..."),
     ("Distilling cosmic clues...", "Embracing celestial messages...")
 ]
+
+# OpenAI settings used for every reading
+READING_MODEL = "gpt-4o-mini"
+READING_SYSTEM_PROMPT = (
+    "You are a tarot card reader that provides supportive, concise, and easy-to-understand readings. "
+    "Focus specifically on answering the user's question using the symbolism of the drawn cards. "
+    "Provide interpretations that are both meaningful and practical."
+)
+READING_PROMPT_TEMPLATE = (
+    "I have drawn the following tarot cards: {cards}. "
+    "The focus question is: '{question}'. "
+    "Please provide a fun, insightful, and easy-to-understand tarot reading that interprets these cards "
+    "in {sentences} sentences or less."
+)
+READING_TEMPERATURE = 0.7
+# Budgets per reading mode (one card = card of the day, more = spread):
+# prompt_tokens caps the prompt sent (long questions are shortened to fit),
+# max_tokens caps the reading. A mode may also set its own "model".
+READING_MODES = {
+    "card_of_the_day": {"prompt_tokens": 200, "max_tokens": 100, "sentences": 2},
+    "spread": {"prompt_tokens": 300, "max_tokens": 150, "sentences": 3},
+}
+# Show readings token by token as they arrive instead of all at once
+STREAM_READINGS = True
+
+# Pauses in the reading flow, in seconds. The reading is requested in the
+# background as soon as the cards are drawn, so these pauses hide API latency.
+# Pick a mode here, with the TAROT_PACING environment variable or `python app.py --pacing`.
+PACING_MODE = "theatrical"
+PACING_MODES = {
+    "theatrical": {"card_delay": 1.0, "reveal_pause": 2.0, "progress_delay": 2.0},
+    "fast": {"card_delay": 0.2, "reveal_pause": 0.3, "progress_delay": 0.3},
+    "zero": {"card_delay": 0.0, "reveal_pause": 0.0, "progress_delay": 0.0},
+}
+
+# Reading cache: identical question/card spreads are served from tarot_reading_cache.db.
+# Up to CACHE_VARIETY different readings are kept per spread and one is picked at random.
+CACHE_ENABLED = True
+CACHE_PATH = "tarot_reading_cache.db"
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 50000
+CACHE_VARIETY = 3
+
+# Batch mode (python batch.py): parallel requests, requests per second and retries
+BATCH_CONCURRENCY = 8
+BATCH_RATE_LIMIT = 5.0
+BATCH_MAX_RETRIES = 5
+# Batch jobs of the same mode are packed up to BATCH_PACK_SIZE per API request, sharing one
+# system prompt; readings missing from a packed answer are retried as single requests.
+BATCH_PACK_SIZE = 5
+BULK_SYSTEM_PROMPT = READING_SYSTEM_PROMPT + (
+    " You will be given several independent draws as a JSON list. Reply with only a JSON object "
+    '{"readings": [{"id": <id>, "reading": <text>}, ...]} containing one reading for every id.'
+)
+BULK_PROMPT_TEMPLATE = "Give a separate reading for each draw, each in {sentences} sentences or less:\n{draws}"
+
+# HTTP service (python server.py): requests handled at once before answering 503,
+# per-request timeout, concurrent API calls over the shared client, and how many
+# recent requests the latency percentiles in /metrics are computed from.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+SERVER_MAX_IN_FLIGHT = 64
+SERVER_REQUEST_TIMEOUT = 30.0
+SERVER_API_CONCURRENCY = 16
+SERVER_API_MAX_RETRIES = 2
+SERVER_LATENCY_WINDOW = 1000
+
+# History storage: "csv" keeps the plain tarot_readings_log.csv file,
+# "sqlite" uses an indexed database (import old logs with `python storage.py import`).
+# Can be overridden with the TAROT_HISTORY_BACKEND environment variable.
+HISTORY_BACKEND = "csv"
+HISTORY_CSV_PATH = "tarot_readings_log.csv"
+HISTORY_DB_PATH = "tarot_readings.db"
+# The SQLite keyword search counts at most this many matches (shown as "1000+").
+SEARCH_COUNT_LIMIT = 1000
+
+# CSV log writes are buffered and flushed after LOG_BUFFER_ROWS rows, LOG_FLUSH_INTERVAL
+# seconds, before any history view and at exit. With LOG_JOURNAL each reading is first
+# fsynced to a small journal so a crash cannot lose it.
+LOG_BUFFER_ROWS = 32
+LOG_FLUSH_INTERVAL = 1.0
+LOG_JOURNAL = True
+
+# Rotation of the CSV log into compressed monthly segments (see `python storage.py rotate`).
+# HISTORY_ROTATE: None (manual only), "size" (archive the log once it exceeds
+# HISTORY_ROTATE_BYTES) or "month" (archive rows from previous months), checked after
+# each flush. Segments use zstd when the standard library has it (Python 3.14+), else gzip.
+HISTORY_ROTATE = None
+HISTORY_ROTATE_BYTES = 32 * 1024 * 1024
+HISTORY_ARCHIVE_COMPRESSION = "auto"
+
+# Instrumentation (off by default; see metrics.py). METRICS_PATH or the TAROT_METRICS
+# environment variable names the metrics file, written every METRICS_INTERVAL seconds
+# and at exit: Prometheus text if it ends in .prom, JSON otherwise. TAROT_PROFILE=cpu,
+# memory or cpu,memory captures cProfile / tracemalloc data to PROFILE_OUTPUT.* at exit.
+METRICS_PATH = None
+METRICS_INTERVAL = 10.0
+PROFILE_OUTPUT = "tarot_profile"
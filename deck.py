@@ -1,11 +1,104 @@
+import math
 import random
-from config import tarot_cards
+from config import tarot_cards, full_deck, DECK_VARIANT, ALLOW_REVERSALS, REVERSAL_PROBABILITY, DECK_SEED
+from metrics import timed
+
+REVERSED_SUFFIX = " (Reversed)"
+
+# Spreads sampled per NumPy batch in draw_many, to bound temporary memory.
+DRAW_CHUNK = 65536
+
+
+def card_name(card, reversed_=False):
+    return card + REVERSED_SUFFIX if reversed_ else card
+
+
+def base_card(name):
+    """Strips the reversed marker from a drawn card name."""
+    return name[:-len(REVERSED_SUFFIX)] if name.endswith(REVERSED_SUFFIX) else name
+
 
 class TarotDeck:
-    """Manages the tarot deck, including shuffling and drawing cards."""
-    def __init__(self):
-        self.cards = tarot_cards
+    """Manages the tarot deck, including shuffling and drawing cards.
 
+    Cards are addressed by their index in `cards`. Draws are without
+    replacement, optionally weighted per card, and come from a seedable RNG
+    so they can be reproduced. `draw_many` samples whole batches of spreads
+    with NumPy for simulations.
+    """
+    def __init__(self, variant=DECK_VARIANT, reversals=ALLOW_REVERSALS, weights=None, seed=DECK_SEED,
+                 reversal_probability=REVERSAL_PROBABILITY):
+        if variant not in ("major", "full"):
+            raise ValueError(f"Unknown deck variant: {variant}")
+        self.cards = list(tarot_cards if variant == "major" else full_deck)
+        self.reversals = reversals
+        self.reversal_probability = reversal_probability if reversals else 0.0
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self._np_rng = None
+        self.weights = None
+        if weights is not None:
+            self.set_weights(weights)
+
+    def set_weights(self, weights):
+        """Sets relative draw weights, as a list in deck order or a {card name: weight} dict."""
+        if isinstance(weights, dict):
+            weights = [weights.get(card, 1.0) for card in self.cards]
+        if len(weights) != len(self.cards) or any(w <= 0 for w in weights):
+            raise ValueError(f"Expected {len(self.cards)} positive weights")
+        self.weights = [float(w) for w in weights]
+
+    def draw_indices(self, num_cards=3):
+        """Draws unique card indices and their orientations; returns (indices, reversed flags)."""
+        if not 0 < num_cards <= len(self.cards):
+            raise ValueError(f"num_cards must be between 1 and {len(self.cards)}")
+        if self.weights is None:
+            indices = self.rng.sample(range(len(self.cards)), num_cards)
+        else:
+            # Efraimidis-Spirakis: the largest u ** (1 / w) keys form a weighted
+            # sample without replacement, in draw order.
+            keys = [math.log(self.rng.random() or 1e-300) / w for w in self.weights]
+            indices = sorted(range(len(self.cards)), key=keys.__getitem__, reverse=True)[:num_cards]
+        flags = [self.rng.random() < self.reversal_probability for _ in indices]
+        return indices, flags
+
+    @timed("deck.draw_cards")
     def draw_cards(self, num_cards=3):
         """Draws a specified number of unique cards from the deck."""
-        return random.sample(self.cards, num_cards)
+        indices, flags = self.draw_indices(num_cards)
+        return [card_name(self.cards[i], r) for i, r in zip(indices, flags)]
+
+    def draw_many(self, n_spreads, k=3):
+        """Samples `n_spreads` spreads of `k` unique cards at once.
+
+        Returns (indices, reversed) NumPy arrays of shape (n_spreads, k): card
+        indices into `cards` in draw order, and orientation flags. Spreads are
+        generated in chunks so memory stays bounded for millions of draws.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("draw_many requires NumPy (pip install numpy)") from None
+        if self._np_rng is None:
+            self._np_rng = np.random.default_rng(self.seed)
+        rng = self._np_rng
+        n_cards = len(self.cards)
+        if not 0 < k <= n_cards:
+            raise ValueError(f"k must be between 1 and {n_cards}")
+        inv_weights = None if self.weights is None else 1.0 / np.asarray(self.weights)
+
+        indices = np.empty((n_spreads, k), dtype=np.int16)
+        reversed_ = np.zeros((n_spreads, k), dtype=bool)
+        for start in range(0, n_spreads, DRAW_CHUNK):
+            m = min(DRAW_CHUNK, n_spreads - start)
+            keys = rng.random((m, n_cards), dtype=np.float32)
+            if inv_weights is not None:
+                # log(1 - u) is finite for u in [0, 1); log(u) would hit log(0).
+                keys = np.log1p(-keys) * inv_weights
+            # Top-k keys per row, then ordered by key so the order is the draw order.
+            top = np.argpartition(keys, n_cards - k, axis=1)[:, n_cards - k:]
+            order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+            indices[start:start + m] = np.take_along_axis(top, order, axis=1)
+            if self.reversal_probability:
+                reversed_[start:start + m] = rng.random((m, k), dtype=np.float32) < self.reversal_probability
+        return indices, reversed_
@@ -0,0 +1,144 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions like the OpenAI API, with configurable latency and errors."""
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    error_rate = 0.0
+    malformed_rate = 0.0
+    lock = threading.Lock()
+    requests_served = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, n, model, content):
+        """Sends the reading as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = content.split(" ")
+        try:
+            for i, word in enumerate(words):
+                delta = {"content": word if i == 0 else " " + word}
+                self._send_event(n, model, delta, None)
+                time.sleep(self.latency / len(words))
+            self._send_event(n, model, {}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream.
+            pass
+
+    def _send_event(self, n, model, delta, finish_reason):
+        chunk = {
+            "id": f"chatcmpl-fake-{n}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def _bulk_content(self, n, user_message):
+        """Answers a packed request with one reading per draw in its JSON list."""
+        draws = json.loads(user_message[user_message.index("["):user_message.rindex("]") + 1])
+        if random.random() < self.malformed_rate:
+            # Either drop a reading or break the JSON, like a truncated answer.
+            if random.random() < 0.5:
+                draws = draws[1:]
+            else:
+                return '{"readings": [{"id": '
+        return json.dumps({"readings": [
+            {"id": d["id"], "reading": f"The cards speak (fake reading #{n}.{i}): {', '.join(d['cards'])}."}
+            for i, d in enumerate(draws)
+        ]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(self.latency)
+        with self.lock:
+            FakeOpenAIHandler.requests_served += 1
+            n = FakeOpenAIHandler.requests_served
+        if random.random() < self.error_rate:
+            if random.random() < 0.5:
+                self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {"Retry-After": "0"})
+            else:
+                self._send_json(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+            return
+
+        user_message = request["messages"][-1]["content"]
+        content = f"The cards speak (fake reading #{n}): {user_message[:80]}"
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            content = self._bulk_content(n, user_message)
+        if request.get("stream"):
+            self._send_stream(n, request.get("model", "fake-model"), content)
+            return
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(user_message) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(user_message) + len(content)) // 4},
+        })
+
+
+def serve(host="127.0.0.1", port=8000, latency=0.2, error_rate=0.0, malformed_rate=0.0):
+    """Starts the fake server in a background thread and returns it."""
+    FakeOpenAIHandler.latency = latency
+    FakeOpenAIHandler.error_rate = error_rate
+    FakeOpenAIHandler.malformed_rate = malformed_rate
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of packed JSON answers that are broken or incomplete")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.error_rate, args.malformed_rate)
+    print(f"Fake OpenAI API listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,37 @@
-import os
-import csv
-from datetime import datetime
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.markup import escape
 
+from metrics import span, timed
+from storage import create_store, format_timestamp
+
 class HistoryManager:
     def show_card_frequency(self):
         """Displays a table and ASCII bar chart of tarot card draw frequencies."""
-        if not os.path.isfile(self.file_path):
+        if not self.store.exists():
             self.console.print("\n[yellow]No reading history found.[/yellow]")
             Prompt.ask("\nPress Enter to return to the main menu...")
             return
 
-        from collections import Counter
-
         try:
-            with open(self.file_path, mode="r", newline='', encoding="utf-8") as f:
-                reader = csv.reader(f)
-                try:
-                    header = next(reader)
-                except StopIteration:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-                readings = list(reader)
-                if not readings:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-
-                all_cards = []
-                for row in readings:
-                    cards = [c.strip() for c in row[2].split(",") if c.strip()]
-                    all_cards.extend(cards)
-                if not all_cards:
-                    self.console.print("[yellow]No cards found in history.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-
-                freq = Counter(all_cards)
-                sorted_cards = freq.most_common()
-                max_card_len = max(len(card) for card, _ in sorted_cards)
-                max_count = max(count for _, count in sorted_cards)
-                bar_width = 30
-
+            if self.store.is_empty():
+                self.console.print("[yellow]Your history is empty.[/yellow]")
+                Prompt.ask("\nPress Enter to return to the main menu...")
+                return
+
+            with span("history.frequency.compute"):
+                sorted_cards = self.store.card_frequency()
+            if not sorted_cards:
+                self.console.print("[yellow]No cards found in history.[/yellow]")
+                Prompt.ask("\nPress Enter to return to the main menu...")
+                return
+
+            max_card_len = max(len(card) for card, _ in sorted_cards)
+            max_count = max(count for _, count in sorted_cards)
+            bar_width = 30
+
+            with span("history.frequency.render"):
                 self.console.print(Panel.fit("[bold magenta]--- Card Frequency Table ---[/bold magenta]", padding=(1, 2)))
                 self.console.print(f"{'Card'.ljust(max_card_len)} | Count | Bar")
                 self.console.print("-" * (max_card_len + 18))
@@ -55,157 +41,180 @@ class HistoryManager:
         except Exception as e:
             self.console.print(f"[red]Error displaying card frequency: {escape(str(e))}[/red]")
         Prompt.ask("\nPress Enter to return to the main menu...")
+    def _keyword_search(self):
+        """Ranked keyword search over questions and readings, with optional card and date filters."""
+        keywords = Prompt.ask('Enter keywords (use "quotes" for a phrase)', default="")
+        card = Prompt.ask("Only readings with this card (Enter for any)", default="")
+        date_from = Prompt.ask("From date (YYYY-MM-DD, Enter for no limit)", default="")
+        date_to = Prompt.ask("To date (YYYY-MM-DD, Enter for no limit)", default="")
+
+        page_size = 5
+        page_number = 0
+        while True:
+            with span("history.keyword.query"):
+                results = self.store.query(keywords, card, date_from.strip(), date_to.strip(), page_number, page_size)
+            if not results.total:
+                self.console.print("[yellow]No readings found for your search.[/yellow]")
+                return
+            total_pages = (results.total + page_size - 1) // page_size
+            # A capped total is a lower bound: more pages follow.
+            more = "+" if results.capped else ""
+            with span("history.keyword.render"):
+                self.console.print(f"[green]Found {results.total}{more} matching readings.[/green] [bold]Page {page_number + 1} of {total_pages}{more}[/bold]")
+                for row in results.rows:
+                    self._print_reading(row)
+
+            has_next = page_number < total_pages - 1 or results.capped
+            if page_number == 0 and not has_next:
+                return
+            nav_choices = []
+            prompt_text = "[bold]Enter 'q' to quit search results"
+            if page_number > 0:
+                nav_choices.append("p")
+                prompt_text += ", 'p' for previous"
+            if has_next:
+                nav_choices.append("n")
+                prompt_text += ", 'n' for next"
+            nav_choices.append("q")
+            prompt_text += "[/bold]"
+
+            nav_choice = Prompt.ask(prompt_text, choices=nav_choices)
+            if nav_choice == 'n':
+                page_number += 1
+            elif nav_choice == 'p':
+                page_number -= 1
+            else:
+                return
+
     def search_history(self):
-        """Allows the user to search/filter tarot reading history by date, question, or card."""
-        if not os.path.isfile(self.file_path):
+        """Allows the user to search/filter tarot reading history by date, question, card, or keywords."""
+        if not self.store.exists():
             self.console.print("\n[yellow]No reading history found.[/yellow]")
             Prompt.ask("\nPress Enter to return to the main menu...")
             return
 
         self.console.print(Panel.fit("[bold magenta]--- Search Your Reading History ---[/bold magenta]", padding=(1, 2)))
         try:
-            with open(self.file_path, mode="r", newline='', encoding="utf-8") as f:
-                reader = csv.reader(f)
-                try:
-                    header = next(reader)
-                except StopIteration:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-
-                readings = list(reader)
-                if not readings:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-
-                # Prompt for filter type
-                filter_type = Prompt.ask(
-                    "How would you like to search?",
-                    choices=["date", "question", "card", "all", "cancel"],
-                    default="date"
-                )
-                if filter_type == "cancel":
-                    return
-
-                filtered = readings
-                if filter_type == "date":
-                    date_str = Prompt.ask("Enter date (YYYY-MM-DD) or part of date (e.g. 2025-08)").strip()
-                    filtered = [r for r in readings if date_str in r[0]]
-                elif filter_type == "question":
-                    q_str = Prompt.ask("Enter keyword or phrase from your question").strip().lower()
-                    filtered = [r for r in readings if q_str in r[1].lower()]
-                elif filter_type == "card":
-                    card_str = Prompt.ask("Enter card name or part of card name").strip().lower()
-                    filtered = [r for r in readings if card_str in r[2].lower()]
-                elif filter_type == "all":
-                    # Show all readings
-                    pass
-
-                if not filtered:
-                    self.console.print("[yellow]No readings found for your search.[/yellow]")
-                else:
+            if self.store.is_empty():
+                self.console.print("[yellow]Your history is empty.[/yellow]")
+                Prompt.ask("\nPress Enter to return to the main menu...")
+                return
+
+            # Prompt for filter type
+            filter_type = Prompt.ask(
+                "How would you like to search?",
+                choices=["date", "question", "card", "keyword", "all", "cancel"],
+                default="date"
+            )
+            if filter_type == "cancel":
+                return
+            if filter_type == "keyword":
+                self._keyword_search()
+                Prompt.ask("\nPress Enter to return to the main menu...")
+                return
+
+            term = ""
+            if filter_type == "date":
+                term = Prompt.ask("Enter date (YYYY-MM-DD) or part of date (e.g. 2025-08)")
+            elif filter_type == "question":
+                term = Prompt.ask("Enter keyword or phrase from your question")
+            elif filter_type == "card":
+                term = Prompt.ask("Enter card name or part of card name")
+            with span("history.search.scan"):
+                filtered = self.store.search(filter_type, term)
+
+            if not filtered:
+                self.console.print("[yellow]No readings found for your search.[/yellow]")
+            else:
+                with span("history.search.render"):
                     self.console.print(f"[green]Found {len(filtered)} matching readings:[/green]")
                     for row in filtered:
-                        self.console.print(f"\n[bold]Date:[/bold] {escape(row[0])}")
-                        self.console.print(f"[bold]Question:[/bold] {escape(row[1])}")
-                        self.console.print(f"[bold]Cards:[/bold] [yellow]{escape(row[2])}[/yellow]")
-                        self.console.print(f"[bold]Reading:[/bold] {escape(row[3])}")
-                        self.console.print("-" * 20)
+                        self._print_reading(row)
         except Exception as e:
             self.console.print(f"[red]Error searching history: {escape(str(e))}[/red]")
         Prompt.ask("\nPress Enter to return to the main menu...")
-    """Manages the reading history stored in a CSV file."""
-    def __init__(self, file_path="tarot_readings_log.csv"):
-        self.file_path = file_path
+    """Manages the reading history through a pluggable storage backend (CSV or SQLite)."""
+    def __init__(self, file_path=None, store=None):
+        self.store = store or create_store(file_path=file_path)
+        self.file_path = self.store.file_path
         self.console = Console()
 
+    def _print_reading(self, row):
+        """Prints a single history row."""
+        self.console.print(f"\n[bold]Date:[/bold] {escape(row[0])}")
+        self.console.print(f"[bold]Question:[/bold] {escape(row[1])}")
+        self.console.print(f"[bold]Cards:[/bold] [yellow]{escape(row[2])}[/yellow]")
+        self.console.print(f"[bold]Reading:[/bold] {escape(row[3])}")
+        self.console.print("-" * 20)
+
+    @timed("history.log_reading")
     def log_reading(self, question, cards, reading):
-        """Logs a single tarot reading to the CSV file."""
-        file_exists = os.path.isfile(self.file_path)
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        """Appends a single tarot reading to the history store."""
         try:
-            with open(self.file_path, mode="a", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow(["datetime", "question", "cards", "reading"])
-                writer.writerow([now, question, ", ".join(cards), reading])
-        except IOError as e:
+            self.store.append(format_timestamp(), question, cards, reading)
+        except (IOError, OSError) as e:
             self.console.print(f"[red]Error saving reading: {escape(str(e))}[/red]")
 
     def view_history(self):
-        """Displays the tarot reading history from the log file with pagination."""
-        if not os.path.isfile(self.file_path):
+        """Displays the tarot reading history, newest first, one page at a time."""
+        if not self.store.exists():
             self.console.print("\n[yellow]No reading history found.[/yellow]")
             Prompt.ask("\nPress Enter to return to the main menu...")
             return
 
         self.console.print(Panel.fit("[bold magenta]--- Your Reading History ---[/bold magenta]", padding=(1, 2)))
         try:
-            with open(self.file_path, mode="r", newline='', encoding="utf-8") as f:
-                reader = csv.reader(f)
-                try:
-                    header = next(reader)
-                except StopIteration:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-
-                readings = list(reader)
-                if not readings:
-                    self.console.print("[yellow]Your history is empty.[/yellow]")
-                    Prompt.ask("\nPress Enter to return to the main menu...")
-                    return
-                
-                page_size = 5
-                page_number = 0
-                reversed_readings = list(reversed(readings))
-                total_pages = (len(reversed_readings) + page_size - 1) // page_size
-
-                while True:
-                    self.console.print(f"\n[bold]Page {page_number + 1} of {total_pages}[/bold]")
-                    start_index = page_number * page_size
-                    end_index = start_index + page_size
-                    page_readings = reversed_readings[start_index:end_index]
-
-                    for row in page_readings:
-                        self.console.print(f"\n[bold]Date:[/bold] {escape(row[0])}")
-                        self.console.print(f"[bold]Question:[/bold] {escape(row[1])}")
-                        self.console.print(f"[bold]Cards:[/bold] [yellow]{escape(row[2])}[/yellow]")
-                        self.console.print(f"[bold]Reading:[/bold] {escape(row[3])}")
-                        self.console.print("-" * 20)
-
-                    if total_pages <= 1:
-                        break
-
-                    nav_choices = []
-                    prompt_text = "[bold]Enter 'q' to quit history view"
-                    if page_number > 0:
-                        nav_choices.append("p")
-                        prompt_text += ", 'p' for previous"
-                    if page_number < total_pages - 1:
-                        nav_choices.append("n")
-                        prompt_text += ", 'n' for next"
-                    nav_choices.append("q")
-                    prompt_text += "[/bold]"
-                    
-                    nav_choice = Prompt.ask(prompt_text, choices=nav_choices)
-
-                    if nav_choice == 'n':
-                        page_number += 1
-                    elif nav_choice == 'p':
-                        page_number -= 1
-                    elif nav_choice == 'q':
-                        break
+            if self.store.is_empty():
+                self.console.print("[yellow]Your history is empty.[/yellow]")
+                Prompt.ask("\nPress Enter to return to the main menu...")
+                return
+
+            page_size = 5
+            page_number = 0
+
+            while True:
+                with span("history.view.read_page"):
+                    page = self.store.read_page(page_number, page_size)
+                with span("history.view.render"):
+                    if page.total_pages is None:
+                        self.console.print(f"\n[bold]Page {page_number + 1}[/bold]")
+                    else:
+                        self.console.print(f"\n[bold]Page {page_number + 1} of {page.total_pages}[/bold]")
+
+                    for row in page.rows:
+                        self._print_reading(row)
+
+                if page_number == 0 and not page.has_next:
+                    break
+
+                nav_choices = []
+                prompt_text = "[bold]Enter 'q' to quit history view"
+                if page_number > 0:
+                    nav_choices.append("p")
+                    prompt_text += ", 'p' for previous"
+                if page.has_next:
+                    nav_choices.append("n")
+                    prompt_text += ", 'n' for next"
+                nav_choices.append("q")
+                prompt_text += "[/bold]"
+
+                nav_choice = Prompt.ask(prompt_text, choices=nav_choices)
+
+                if nav_choice == 'n':
+                    page_number += 1
+                elif nav_choice == 'p':
+                    page_number -= 1
+                elif nav_choice == 'q':
+                    break
 
         except Exception as e:
             self.console.print(f"[red]Error reading history: {escape(str(e))}[/red]")
-        
+
         Prompt.ask("\nPress Enter to return to the main menu...")
 
     def clear_history(self):
-        """Deletes the tarot reading history log file after confirmation."""
-        if not os.path.isfile(self.file_path):
+        """Deletes the stored tarot reading history after confirmation."""
+        if not self.store.exists():
             self.console.print("\n[yellow]No reading history found. Nothing to clear.[/yellow]")
             Prompt.ask("\nPress Enter to return to the main menu...")
             return
@@ -215,7 +224,7 @@ class HistoryManager:
 
         if confirm == 'y':
             try:
-                os.remove(self.file_path)
+                self.store.clear()
                 self.console.print("\n[green]Reading history has been cleared.[/green]")
             except Exception as e:
                 self.console.print(f"\n[red]Error clearing history: {escape(str(e))}[/red]")
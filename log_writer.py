@@ -0,0 +1,214 @@
+import io
+import os
+import csv
+import mmap
+import atexit
+import itertools
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still buffered, but not locked.
+    fcntl = None
+
+from config import LOG_BUFFER_ROWS, LOG_FLUSH_INTERVAL, LOG_JOURNAL
+
+_journal_ids = itertools.count()
+
+# How far back from the end of the log recovery looks for an already-applied journal.
+RECOVERY_WINDOW = 64 * 1024 * 1024
+
+
+def encode_row(row):
+    """Encodes one CSV row exactly as csv.writer would write it to the log."""
+    buf = io.StringIO(newline="")
+    csv.writer(buf).writerow(row)
+    return buf.getvalue().encode("utf-8")
+
+
+def same_file(fd, path):
+    """True if the open file `fd` is still the file at `path` (not replaced or removed)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (st.st_dev, st.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+class LogWriter:
+    """Buffered, crash-safe appender for a CSV log shared by several processes.
+
+    Rows are buffered in memory and appended in one write when `buffer_rows`
+    rows are waiting, `flush_interval` seconds after the first buffered row,
+    on every read through the store, and at exit. Each append holds an
+    exclusive advisory lock (fcntl.flock) on the log, so rows from concurrent
+    processes never interleave and the header is written exactly once.
+
+    With `journal` enabled every row is fsynced to the writer's own journal
+    file before `write` returns. Journals left behind by a crashed process
+    are replayed into the log the next time a writer opens it (stores open
+    one on read when `orphan_journals` finds any), unless their rows already
+    made it into the log.
+    """
+    def __init__(self, file_path, header, buffer_rows=LOG_BUFFER_ROWS,
+                 flush_interval=LOG_FLUSH_INTERVAL, journal=LOG_JOURNAL, on_flush=None):
+        self.file_path = file_path
+        self.header = encode_row(header)
+        self.buffer_rows = max(1, buffer_rows)
+        self.flush_interval = flush_interval
+        self.journal = journal
+        self.on_flush = on_flush
+        self.journal_path = f"{file_path}.{os.getpid()}-{next(_journal_ids)}.journal"
+        self._buffer = []
+        self._lock = threading.RLock()
+        self._timer = None
+        self._journal_fd = None
+        if journal:
+            self.recover()
+        atexit.register(self.close)
+
+    def write(self, row):
+        """Queues one row; with journaling on it is durable when this returns."""
+        data = encode_row(row)
+        with self._lock:
+            if self.journal:
+                if self._journal_fd is None:
+                    self._journal_fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                _write_all(self._journal_fd, data)
+                os.fsync(self._journal_fd)
+            self._buffer.append(data)
+            if len(self._buffer) >= self.buffer_rows:
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Appends all buffered rows to the log."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        self._append(b"".join(self._buffer))
+        self._buffer = []
+        if self._journal_fd is not None:
+            os.ftruncate(self._journal_fd, 0)
+        if self.on_flush:
+            self.on_flush()
+
+    def _append(self, data, skip_if_present=False):
+        """Appends `data` under an exclusive lock, writing the header to a new file.
+
+        Returns False without writing if `skip_if_present` and the data is
+        already near the end of the log.
+        """
+        fd = self._open_locked()
+        try:
+            size = os.fstat(fd).st_size
+            if skip_if_present and size and self._contains_tail(data, size):
+                return False
+            _write_all(fd, data if size else self.header + data)
+            if self.journal:
+                os.fsync(fd)
+            return True
+        finally:
+            os.close(fd)  # also releases the lock
+
+    def _open_locked(self):
+        """Opens the log for appending under the lock, reopening it if a rotation replaced it meanwhile."""
+        while True:
+            fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if not fcntl:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if same_file(fd, self.file_path):
+                return fd
+            os.close(fd)
+
+    def _contains_tail(self, data, size):
+        with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(data, max(0, size - RECOVERY_WINDOW - len(data))) >= 0
+
+    def recover(self):
+        """Replays journals of writers that died before flushing. Returns the number recovered."""
+        recovered = 0
+        for path in orphan_journals(self.file_path):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue  # another process recovered it first
+            # Drop a row that was only half written when the process died;
+            # csv rows end in \r\n while newlines inside readings are bare \n.
+            data = data[:data.rfind(b"\r\n") + 2] if b"\r\n" in data else b""
+            if data and self._append(data, skip_if_present=True):
+                recovered += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if recovered and self.on_flush:
+            self.on_flush()
+        return recovered
+
+    def discard(self):
+        """Drops buffered rows without writing them (used when the history is cleared)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._buffer = []
+            if self._journal_fd is not None:
+                os.ftruncate(self._journal_fd, 0)
+
+    def close(self):
+        """Flushes remaining rows and removes this process's journal."""
+        with self._lock:
+            self._flush_locked()
+            if self._journal_fd is not None:
+                os.close(self._journal_fd)
+                self._journal_fd = None
+                if os.path.isfile(self.journal_path):
+                    os.remove(self.journal_path)
+
+
+def orphan_journals(file_path):
+    """Paths of journals for `file_path` left behind by processes that are no longer running."""
+    directory = os.path.dirname(file_path) or "."
+    prefix = os.path.basename(file_path) + "."
+    orphans = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return orphans
+    for name in names:
+        if not (name.startswith(prefix) and name.endswith(".journal")):
+            continue
+        pid = name[len(prefix):-len(".journal")].split("-")[0]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            orphans.append(os.path.join(directory, name))
+    return orphans
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
@@ -0,0 +1,193 @@
+"""Lightweight timers, counters and opt-in profiling.
+
+Instrumentation is switched on by environment variables read at import:
+
+    TAROT_METRICS=metrics.json python app.py     # JSON snapshot every METRICS_INTERVAL s
+    TAROT_METRICS=metrics.prom python server.py  # Prometheus text format
+    TAROT_PROFILE=cpu,memory python app.py       # cProfile + tracemalloc, written at exit
+
+When TAROT_METRICS is unset, `timed` returns functions unchanged, `span`
+hands back one shared no-op context manager and `incr` does nothing, so the
+instrumented code paths cost a function call at most.
+"""
+import os
+import re
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import nullcontext
+
+from config import METRICS_PATH, METRICS_INTERVAL, PROFILE_OUTPUT
+
+METRICS_FILE = os.getenv("TAROT_METRICS") or METRICS_PATH
+INTERVAL = float(os.getenv("TAROT_METRICS_INTERVAL") or METRICS_INTERVAL)
+PROFILE = {mode.strip() for mode in os.getenv("TAROT_PROFILE", "").lower().split(",") if mode.strip()}
+ENABLED = bool(METRICS_FILE)
+
+
+class Registry:
+    """Thread-safe counters and timers (count, total, max seconds)."""
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "timers": {
+                    name: {"count": count, "total_seconds": round(total, 6),
+                           "mean_ms": round(total / count * 1000, 3), "max_ms": round(peak * 1000, 3)}
+                    for name, (count, total, peak) in sorted(self.timers.items())
+                },
+            }
+
+    def prometheus(self):
+        """Renders the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot["counters"].items():
+            metric = f"tarot_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, timer in snapshot["timers"].items():
+            metric = f"tarot_{_metric_name(name)}_seconds"
+            lines += [f"# TYPE {metric} summary",
+                      f"{metric}_count {timer['count']}",
+                      f"{metric}_sum {timer['total_seconds']}",
+                      f"# TYPE {metric}_max gauge",
+                      f"{metric}_max {timer['max_ms'] / 1000}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically replaces `path` with the current metrics."""
+        text = self.prometheus() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=2)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Span:
+    """Context manager recording the time spent inside it under `name`."""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+REGISTRY = Registry()
+_NULL_SPAN = nullcontext()
+
+
+if ENABLED:
+    def incr(name, n=1):
+        REGISTRY.incr(name, n)
+
+    def span(name):
+        return Span(name)
+
+    def timed(name):
+        """Decorator timing every call of the function under `name`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    REGISTRY.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+else:
+    def incr(name, n=1):
+        pass
+
+    def span(name):
+        return _NULL_SPAN
+
+    def timed(name):
+        return lambda fn: fn
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def _export_loop(stop):
+    while not stop.wait(INTERVAL):
+        REGISTRY.write(METRICS_FILE)
+
+
+def _start_exporter():
+    stop = threading.Event()
+    threading.Thread(target=_export_loop, args=(stop,), daemon=True, name="metrics-export").start()
+
+    def final_write():
+        stop.set()
+        REGISTRY.write(METRICS_FILE)
+    atexit.register(final_write)
+
+
+def _start_profiling():
+    """Starts cProfile (main thread) and/or tracemalloc; results are written at exit."""
+    if "cpu" in PROFILE:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump_cpu():
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(f"{PROFILE_OUTPUT}.prof")
+            with open(f"{PROFILE_OUTPUT}.cpu.txt", "w", encoding="utf-8") as f:
+                pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+        atexit.register(dump_cpu)
+    if "memory" in PROFILE:
+        import tracemalloc
+        tracemalloc.start(25)
+
+        def dump_memory():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:40]
+            tracemalloc.stop()
+            with open(f"{PROFILE_OUTPUT}.memory.txt", "w", encoding="utf-8") as f:
+                f.write(f"current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                f.writelines(f"{stat}\n" for stat in top)
+        atexit.register(dump_memory)
+
+
+if ENABLED:
+    _start_exporter()
+if PROFILE:
+    _start_profiling()
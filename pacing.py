@@ -0,0 +1,38 @@
+import os
+import time
+
+from config import PACING_MODE, PACING_MODES
+
+
+class PacingPolicy:
+    """Controls the dramatic pauses in the reading flow."""
+    def __init__(self, name, card_delay, reveal_pause, progress_delay):
+        self.name = name
+        self.card_delay = card_delay
+        self.reveal_pause = reveal_pause
+        self.progress_delay = progress_delay
+
+    @staticmethod
+    def _pause(seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def card(self):
+        """Pause while a single card is revealed."""
+        self._pause(self.card_delay)
+
+    def reveal(self):
+        """Pause after all cards are on the table."""
+        self._pause(self.reveal_pause)
+
+    def progress(self):
+        """Pause on one progress message."""
+        self._pause(self.progress_delay)
+
+
+def get_pacing(name=None):
+    """Returns the pacing policy named by `name`, TAROT_PACING or config.PACING_MODE."""
+    name = name or os.getenv("TAROT_PACING") or PACING_MODE
+    if name not in PACING_MODES:
+        raise ValueError(f"Unknown pacing mode: {name} (choose from {', '.join(PACING_MODES)})")
+    return PacingPolicy(name, **PACING_MODES[name])
@@ -0,0 +1,148 @@
+import json
+import math
+
+from config import (
+    READING_MODEL, READING_SYSTEM_PROMPT, READING_PROMPT_TEMPLATE, READING_TEMPERATURE, READING_MODES,
+    BULK_SYSTEM_PROMPT, BULK_PROMPT_TEMPLATE,
+)
+
+# Approximate overhead of the chat format: per message and per request.
+MESSAGE_TOKENS = 4
+REQUEST_TOKENS = 3
+# Answer tokens reserved per reading for the JSON wrapping of a packed request.
+BULK_TOKENS_PER_READING = 20
+
+_encodings = {}
+
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            import tiktoken
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # tiktoken is optional (and may fail to fetch its tables offline).
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model=READING_MODEL):
+    """Counts tokens with tiktoken when installed, otherwise estimates about 4 characters per token."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model=READING_MODEL):
+    """Counts the prompt tokens of a chat request."""
+    return sum(count_tokens(m["content"], model) + MESSAGE_TOKENS for m in messages) + REQUEST_TOKENS
+
+
+def reading_mode(cards):
+    """Card of the day for a single card, spread otherwise."""
+    return "card_of_the_day" if len(cards) == 1 else "spread"
+
+
+def build_messages(question, cards, mode=None):
+    """Builds the chat messages asking for a reading of `cards` focused on `question`."""
+    settings = READING_MODES[mode or reading_mode(cards)]
+    prompt = READING_PROMPT_TEMPLATE.format(
+        cards=", ".join(cards), question=question, sentences=settings["sentences"]
+    )
+    return [
+        {"role": "system", "content": READING_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def fit_question(question, cards, mode=None):
+    """Cuts the question at the last word boundary that keeps the prompt within the mode's token budget.
+
+    The cut point is found by binary search, so a long question costs a
+    logarithmic number of token counts rather than one per word.
+    """
+    mode = mode or reading_mode(cards)
+    settings = READING_MODES[mode]
+    model = settings.get("model", READING_MODEL)
+    budget = settings["prompt_tokens"]
+    if count_message_tokens(build_messages(question, cards, mode), model) <= budget:
+        return question
+    words = question.split()
+
+    def shortened(n):
+        return " ".join(words[:n]) + "..."
+
+    def fits(n):
+        return count_message_tokens(build_messages(shortened(n), cards, mode), model) <= budget
+
+    if not fits(0):
+        raise ValueError(f"Prompt for {len(cards)} cards exceeds the {mode} budget of {budget} tokens")
+    # Largest word count below the full question whose prompt fits.
+    low, high = 0, max(len(words) - 1, 0)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return shortened(low)
+
+
+def completion_params(question, cards, mode=None):
+    """Returns the keyword arguments for a chat completion request within the mode's budget."""
+    mode = mode or reading_mode(cards)
+    settings = READING_MODES[mode]
+    return dict(
+        model=settings.get("model", READING_MODEL),
+        messages=build_messages(fit_question(question, cards, mode), cards, mode),
+        max_tokens=settings["max_tokens"],
+        temperature=READING_TEMPERATURE
+    )
+
+
+def bulk_params(jobs, mode):
+    """Packs several (id, question, cards) jobs into one request answered as JSON."""
+    settings = READING_MODES[mode]
+    draws = [
+        {"id": job_id, "question": fit_question(question, cards, mode), "cards": list(cards)}
+        for job_id, question, cards in jobs
+    ]
+    prompt = BULK_PROMPT_TEMPLATE.format(sentences=settings["sentences"], draws=json.dumps(draws))
+    return dict(
+        model=settings.get("model", READING_MODEL),
+        messages=[
+            {"role": "system", "content": BULK_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=(settings["max_tokens"] + BULK_TOKENS_PER_READING) * len(jobs),
+        temperature=READING_TEMPERATURE,
+        response_format={"type": "json_object"},
+    )
+
+
+def parse_bulk(text, ids):
+    """Splits a packed answer into {id: reading}.
+
+    Raises ValueError if the answer is not the expected JSON object. Entries
+    with unknown ids or empty readings are dropped, so callers can retry the
+    ids that are missing from the result.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").partition("\n")[2]
+    data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("readings"), list):
+        raise ValueError("expected an object with a readings list")
+    wanted = set(ids)
+    readings = {}
+    for entry in data["readings"]:
+        if not isinstance(entry, dict):
+            continue
+        job_id, reading = entry.get("id"), entry.get("reading")
+        if job_id in wanted and isinstance(reading, str) and reading.strip():
+            readings[job_id] = reading.strip()
+    return readings
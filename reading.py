@@ -0,0 +1,66 @@
+import os
+from collections import deque
+
+from prompts import completion_params
+
+
+class ReadingStats:
+    """Latency, token use and failure rate of reading requests.
+
+    A packed request counts each of its readings with the request's latency
+    and an even share of its tokens. Latency percentiles cover the latest
+    `window` readings.
+    """
+    def __init__(self, window=10000):
+        self.requests = 0
+        self.readings = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds, usage=None, readings=1):
+        self.requests += 1
+        self.readings += readings
+        self.latencies.extend([seconds] * readings)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        pick = lambda p: round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1) if ordered else None
+        attempts = self.readings + self.failures
+        return {
+            "requests": self.requests,
+            "readings": self.readings,
+            "failures": self.failures,
+            "failure_rate": round(self.failures / attempts, 4) if attempts else 0.0,
+            "fallbacks": self.fallbacks,
+            "latency_p50_ms": pick(50),
+            "latency_p90_ms": pick(90),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_reading": round((self.prompt_tokens + self.completion_tokens) / self.readings, 1)
+            if self.readings else 0.0,
+        }
+
+
+def load_api_key():
+    """Loads .env and configures the module-level OpenAI API key."""
+    import openai
+    from dotenv import load_dotenv
+    load_dotenv()
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+
+
+def fetch_reading(question, cards):
+    """Requests a single reading from the OpenAI API and returns its text."""
+    import openai
+    response = openai.chat.completions.create(**completion_params(question, cards))
+    return response.choices[0].message.content.strip()
@@ -0,0 +1,342 @@
+import io
+import os
+import csv
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is not locked against other writers.
+    fcntl = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+from config import HISTORY_ARCHIVE_COMPRESSION
+from log_writer import encode_row, same_file
+from metrics import incr
+
+# Bytes at the start of the log compared to tell whether an interrupted rotation rewrote it.
+HEAD_BYTES = 4096
+
+
+def _codec(name=HISTORY_ARCHIVE_COMPRESSION):
+    """Returns (suffix, open function) for "zstd", "gzip" or "auto" (zstd when available)."""
+    if name == "zstd" and zstd is None:
+        raise RuntimeError("zstd compression needs Python 3.14 or newer")
+    if name in ("zstd", "auto") and zstd is not None:
+        return ".zst", zstd.open
+    return ".gz", gzip.open
+
+
+def _open_segment(path, mode="rt"):
+    opener = zstd.open if path.endswith(".zst") else gzip.open
+    return opener(path, mode, encoding="utf-8", newline="")
+
+
+def _head(f):
+    f.seek(0)
+    return hashlib.sha1(f.read(HEAD_BYTES)).hexdigest()
+
+
+def _fsync_dir(path):
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _cards(row):
+    return [c.strip() for c in row[2].split(",") if c.strip()]
+
+
+class SegmentArchive:
+    """Immutable, compressed monthly segments split off the CSV log.
+
+    Rotation moves complete rows out of the live log into one segment per
+    calendar month (`<log>.segments/2025-03.0001.csv.gz`). A manifest lists
+    every segment with its row count, first and last timestamp and per-card
+    counts, so readers can skip segments outside a date range or without a
+    card, and card frequencies never need to open a segment at all.
+
+    Rotation holds the same exclusive lock as LogWriter appends. The trimmed
+    log is written and fsynced next to the old one and renamed over it, so a
+    crash leaves one complete file or the other; writers that were waiting
+    for the lock notice the new file and reopen it, and readers that still
+    have the old file open or mapped keep reading it. A rotation interrupted
+    after its segments were recorded is finished the next time the archive
+    is used.
+    """
+    def __init__(self, log_path, header):
+        self.log_path = log_path
+        self.header = encode_row(header)
+        self.directory = log_path + ".segments"
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.segments = []
+        self._stamp = None
+        self._pending = None
+        # (file, rows) of the segment last decoded for paging; segments never change.
+        self._page_cache = None
+
+    def load(self):
+        """Reloads the manifest if it changed; finishes an interrupted rotation."""
+        self._read_manifest()
+        if self._pending:
+            with self._locked_log() as log:
+                # Another process may have finished it while we waited for the lock.
+                self._read_manifest(force=True)
+                if self._pending:
+                    self._finish_pending(log)
+        return self
+
+    def _read_manifest(self, force=False):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            self.segments, self._stamp, self._pending = [], None, None
+            return
+        stamp = (st.st_size, st.st_mtime_ns)
+        if force or stamp != self._stamp:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.segments = manifest["segments"]
+            self._pending = manifest.get("pending")
+            self._stamp = stamp
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.segments.sort(key=lambda s: (s["first"], s["file"]))
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"segments": self.segments, "pending": self._pending}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self._stamp = None
+
+    @property
+    def rows(self):
+        return sum(s["rows"] for s in self.segments)
+
+    def card_counts(self):
+        counts = Counter()
+        for segment in self.segments:
+            counts.update(segment["cards"])
+        return counts
+
+    def select(self, date_from="", date_to="", card=""):
+        """Segments that can hold rows in [date_from, date_to] with a card containing `card`."""
+        card = card.strip().lower()
+        selected = []
+        for segment in self.segments:
+            if date_from and segment["last"] < date_from:
+                continue
+            # Segment bounds are full timestamps; compare on the prefix given.
+            if date_to and segment["first"][:len(date_to)] > date_to:
+                continue
+            if card and not any(card in name.lower() for name in segment["cards"]):
+                continue
+            selected.append(segment)
+        return selected
+
+    def iter_segment(self, segment):
+        """Streams one segment's rows, oldest first."""
+        with _open_segment(os.path.join(self.directory, segment["file"])) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            scanned = 0
+            try:
+                for row in reader:
+                    if row:
+                        scanned += 1
+                        yield row
+            finally:
+                incr("history_rows_scanned", scanned)
+                incr("history_segments_read")
+
+    def iter_rows(self, date_from="", date_to="", card=""):
+        """Streams the rows of all matching segments, oldest first."""
+        for segment in self.select(date_from, date_to, card):
+            yield from self.iter_segment(segment)
+
+    def rows_newest_first(self, skip, limit):
+        """Returns up to `limit` archived rows after skipping the `skip` newest ones.
+
+        Whole segments are skipped using the manifest row counts; only the
+        segments overlapping the window are decompressed, and the last one is
+        kept so paging through a segment decodes it once.
+        """
+        rows = []
+        for segment in reversed(self.segments):
+            if len(rows) >= limit:
+                break
+            if skip >= segment["rows"]:
+                skip -= segment["rows"]
+                continue
+            # Rows [lo, hi) in file order are the wanted newest-first slice of this segment.
+            hi = segment["rows"] - skip
+            lo = max(0, hi - (limit - len(rows)))
+            if self._page_cache is None or self._page_cache[0] != segment["file"]:
+                self._page_cache = (segment["file"], list(self.iter_segment(segment)))
+            rows.extend(reversed(self._page_cache[1][lo:hi]))
+            skip = 0
+        return rows
+
+    def _locked_log(self):
+        while True:
+            f = open(self.log_path, "r+b")
+            if not fcntl:
+                return f
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            if same_file(f.fileno(), self.log_path):
+                return f  # closing the file releases the lock
+            f.close()  # replaced by a rotation while we waited
+
+    def _next_id(self):
+        return max((int(s["file"].split(".")[1]) for s in self.segments), default=0) + 1
+
+    def _write_segments(self, rows):
+        """Writes rows to new monthly segments; returns their manifest entries."""
+        suffix, opener = _codec()
+        os.makedirs(self.directory, exist_ok=True)
+        open_files, entries = {}, {}
+        try:
+            for row in rows:
+                month = row[0][:7]
+                if month not in open_files:
+                    name = f"{month}.{self._next_id() + len(entries):04d}.csv{suffix}"
+                    path = os.path.join(self.directory, name)
+                    open_files[month] = opener(path + ".tmp", "wt", encoding="utf-8", newline="")
+                    open_files[month].write(self.header.decode("utf-8"))
+                    entries[month] = {"file": name, "rows": 0, "first": row[0], "last": row[0],
+                                      "cards": Counter()}
+                open_files[month].write(encode_row(row).decode("utf-8"))
+                entry = entries[month]
+                entry["rows"] += 1
+                entry["first"] = min(entry["first"], row[0])
+                entry["last"] = max(entry["last"], row[0])
+                entry["cards"].update(_cards(row))
+        finally:
+            for f in open_files.values():
+                f.close()
+        for entry in entries.values():
+            path = os.path.join(self.directory, entry["file"])
+            with open(path + ".tmp", "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            entry["bytes"] = os.path.getsize(path)
+            entry["cards"] = dict(entry["cards"])
+        return list(entries.values())
+
+    def _rewrite_log(self, log, size, keep_from):
+        """Replaces the log with: header, rows before `size` dated >= keep_from, then the rest.
+
+        Rebuilt from the old log each time, so finishing an interrupted
+        rotation is safe whether or not the first attempt got this far.
+        """
+        staged_path = self.log_path + ".rotate"
+        with tempfile.TemporaryFile() as head, open(staged_path, "wb") as staged:
+            log.seek(0)
+            remaining = size
+            while remaining:
+                chunk = log.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                head.write(chunk)
+                remaining -= len(chunk)
+            head.seek(0)
+            staged.write(self.header)
+            if keep_from:
+                text = io.TextIOWrapper(head, encoding="utf-8", newline="")
+                reader = csv.reader(text)
+                next(reader, None)
+                for row in reader:
+                    if row and row[0] >= keep_from:
+                        staged.write(encode_row(row))
+                text.detach()
+            # Rows appended after `size` (only possible when finishing an interrupted rotation).
+            log.seek(size)
+            shutil.copyfileobj(log, staged)
+            staged.flush()
+            os.fsync(staged.fileno())
+        os.replace(staged_path, self.log_path)
+        _fsync_dir(os.path.dirname(self.log_path) or ".")
+
+    def _finish_pending(self, log):
+        pending = self._pending
+        if pending and _head(log) == pending["head"]:
+            self._rewrite_log(log, pending["size"], pending["keep_from"])
+        self._pending = None
+        self._save()
+
+    def rotate(self, by="size", max_bytes=0, now=None):
+        """Moves rows out of the live log into segments. Returns the number of rows archived.
+
+        by="size" archives every row once the log is larger than `max_bytes`.
+        by="month" archives every row from before the current month.
+        """
+        if not os.path.isfile(self.log_path):
+            return 0
+        self.load()
+        with self._locked_log() as log:
+            size = os.fstat(log.fileno()).st_size
+            if by == "size":
+                if size <= max(max_bytes, len(self.header)):
+                    return 0
+                keep_from = None
+            elif by == "month":
+                keep_from = (now or datetime.now()).strftime("%Y-%m")
+            else:
+                raise ValueError(f"Unknown rotation policy: {by}")
+
+            log.seek(0)
+            text = io.TextIOWrapper(log, encoding="utf-8", newline="")
+            reader = csv.reader(text)
+            next(reader, None)
+            archived = (row for row in reader if row and not (keep_from and row[0] >= keep_from))
+            entries = self._write_segments(archived)
+            text.detach()
+            if not entries:
+                return 0
+
+            self.segments.extend(entries)
+            self._pending = {"size": size, "head": _head(log), "keep_from": keep_from}
+            self._save()
+            self._finish_pending(log)
+        return sum(entry["rows"] for entry in entries)
+
+    def compact(self):
+        """Merges segments of the same month into one. Returns the number of segments removed."""
+        self.load()
+        by_month = {}
+        for segment in self.segments:
+            by_month.setdefault(segment["file"][:7], []).append(segment)
+        removed = 0
+        with self._locked_log():
+            for month, group in by_month.items():
+                if len(group) < 2:
+                    continue
+                rows = sorted((row for segment in group for row in self.iter_segment(segment)),
+                              key=lambda row: row[0])
+                entries = self._write_segments(rows)
+                self.segments = [s for s in self.segments if s not in group] + entries
+                self._save()
+                for segment in group:
+                    os.remove(os.path.join(self.directory, segment["file"]))
+                removed += len(group) - 1
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.segments, self._stamp, self._pending = [], None, None
+        self._page_cache = None
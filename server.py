@@ -0,0 +1,398 @@
+"""Local HTTP service for web front-ends, built on asyncio streams.
+
+    python server.py --port 8080
+    python server.py --base-url http://127.0.0.1:8000/v1   # against fake_openai.py
+
+Endpoints (JSON in and out):
+
+    GET  /draw?cards=3&deck=full&reversed=1&seed=7
+    POST /reading          {"question": ..., "cards": [...]} or {"question": ..., "num_cards": 3}
+    GET  /history?page=1&page_size=5
+    GET  /history/search?q=...&card=...&from=2025-01&to=2025-06&page=1
+    GET  /stats
+    GET  /metrics          request counts and latency percentiles per endpoint
+    GET  /health
+
+All readings go through one shared AsyncOpenAI client, so connections to the
+API are pooled and reused across requests. Each request runs under a timeout
+(504 when exceeded), and once SERVER_MAX_IN_FLIGHT requests are being handled
+new ones are answered 503 straight away instead of queueing without bound.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import openai
+from dotenv import load_dotenv
+
+from cache import ReadingCache
+from config import (
+    CACHE_ENABLED, SERVER_HOST, SERVER_PORT, SERVER_MAX_IN_FLIGHT, SERVER_REQUEST_TIMEOUT,
+    SERVER_API_CONCURRENCY, SERVER_API_MAX_RETRIES, SERVER_LATENCY_WINDOW,
+)
+from deck import TarotDeck
+from history import HistoryManager
+from metrics import ENABLED as METRICS_ENABLED, incr, snapshot
+from prompts import completion_params
+from reading import ReadingStats
+
+MAX_BODY_BYTES = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+           503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyTracker:
+    """Keeps the latest request durations per endpoint and reports percentiles."""
+    def __init__(self, window=SERVER_LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, route, status, seconds):
+        self.samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+        key = (route, status)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def summary(self):
+        result = {}
+        for route, samples in self.samples.items():
+            ordered = sorted(samples)
+            # Nearest-rank percentiles over the window.
+            pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+            result[route] = {
+                "requests": {str(status): n for (r, status), n in sorted(self.counts.items()) if r == route},
+                "p50_ms": round(pick(50) * 1000, 2),
+                "p90_ms": round(pick(90) * 1000, 2),
+                "p99_ms": round(pick(99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return result
+
+
+class TarotService:
+    """Routes HTTP requests to the deck, the reading API and the history store."""
+    def __init__(self, client, cache=None, max_in_flight=SERVER_MAX_IN_FLIGHT,
+                 timeout=SERVER_REQUEST_TIMEOUT, api_concurrency=SERVER_API_CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.api_slots = asyncio.Semaphore(api_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+        self.latency = LatencyTracker()
+        self.reading_stats = ReadingStats()
+        self.started = time.time()
+        self.deck = TarotDeck()
+        # The history store and the cache are not thread-safe, and each lookup
+        # or write is blocking disk I/O; one worker thread owns each of them.
+        self.history_executor = ThreadPoolExecutor(max_workers=1)
+        self.cache_executor = ThreadPoolExecutor(max_workers=1)
+        self._history_manager = None
+        self.routes = {
+            "/draw": ("GET", self.draw),
+            "/reading": ("POST", self.reading),
+            "/history": ("GET", self.history),
+            "/history/search": ("GET", self.history_search),
+            "/stats": ("GET", self.stats),
+            "/metrics": ("GET", self.metrics),
+            "/health": ("GET", self.health),
+        }
+
+    async def _history(self, fn, *args):
+        """Runs fn(history_manager, *args) on the history thread."""
+        def call():
+            if self._history_manager is None:
+                self._history_manager = HistoryManager()
+            return fn(self._history_manager, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.history_executor, call)
+
+    async def _cached(self, fn, *args):
+        """Runs a ReadingCache method on the cache thread."""
+        return await asyncio.get_running_loop().run_in_executor(self.cache_executor, fn, *args)
+
+    def _deck(self, options):
+        """Returns the shared deck, or a new one when the request picks deck options."""
+        variant = options.get("deck")
+        reversed_ = options.get("reversed")
+        seed = options.get("seed")
+        if variant is None and reversed_ is None and seed is None:
+            return self.deck
+        # Only the options the request sets; the rest come from config.py.
+        options = {}
+        if variant is not None:
+            options["variant"] = variant
+        if reversed_ is not None:
+            options["reversals"] = str(reversed_).lower() in ("1", "true", "yes")
+        try:
+            if seed is not None:
+                options["seed"] = int(seed)
+            return TarotDeck(**options)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+    @staticmethod
+    def _int(params, name, default, low=1, high=None):
+        try:
+            value = int(params.get(name, default))
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{name} must be an integer")
+        if high is None and value < low:
+            raise HTTPError(400, f"{name} must be at least {low}")
+        if high is not None and not low <= value <= high:
+            raise HTTPError(400, f"{name} must be between {low} and {high}")
+        return value
+
+    async def draw(self, params, body):
+        deck = self._deck(params)
+        cards = deck.draw_cards(self._int(params, "cards", 3, high=len(deck.cards)))
+        return {"cards": cards}
+
+    async def reading(self, params, body):
+        question = body.get("question") or "What do the cards have to say?"
+        if not isinstance(question, str):
+            raise HTTPError(400, "question must be a string")
+        cards = body.get("cards")
+        if cards is None:
+            deck = self._deck(body)
+            cards = deck.draw_cards(self._int(body, "num_cards", 3, high=len(deck.cards)))
+        elif not (isinstance(cards, list) and cards and all(isinstance(c, str) for c in cards)):
+            raise HTTPError(400, "cards must be a non-empty list of card names")
+        try:
+            # Fitting a long question to the token budget is CPU work; keep it off the loop.
+            params = await asyncio.get_running_loop().run_in_executor(None, completion_params, question, cards)
+        except ValueError as e:  # e.g. so many cards that the prompt cannot fit its budget
+            raise HTTPError(400, str(e))
+        reading = await self._cached(self.cache.get, question, cards) if self.cache else None
+        cached = reading is not None
+        if not cached:
+            async with self.api_slots:
+                start = time.perf_counter()
+                incr("api_calls")
+                try:
+                    response = await self.client.chat.completions.create(**params)
+                except openai.OpenAIError as e:
+                    incr("api_errors")
+                    self.reading_stats.record_failure()
+                    raise HTTPError(502, f"Reading failed: {e}")
+                self.reading_stats.record(time.perf_counter() - start, response.usage)
+            reading = response.choices[0].message.content.strip()
+            if self.cache:
+                await self._cached(self.cache.put, question, cards, reading)
+        if body.get("log", True):
+            await self._history(lambda manager: manager.log_reading(question, cards, reading))
+        return {"question": question, "cards": cards, "reading": reading, "cached": cached}
+
+    async def history(self, params, body):
+        page = self._int(params, "page", 1)
+        page_size = self._int(params, "page_size", 5, high=100)
+
+        def read(manager):
+            if not manager.store.exists():
+                return [], False
+            result = manager.store.read_page(page - 1, page_size)
+            return result.rows, result.has_next
+        rows, has_next = await self._history(read)
+        return {"page": page, "rows": [_row_dict(r) for r in rows], "has_next": has_next}
+
+    async def history_search(self, params, body):
+        page = self._int(params, "page", 1)
+        page_size = self._int(params, "page_size", 10, high=100)
+
+        def query(manager):
+            if not manager.store.exists():
+                return [], 0, False
+            return manager.store.query(params.get("q", ""), params.get("card", ""), params.get("from", ""),
+                                       params.get("to", ""), page - 1, page_size)
+        rows, total, capped = await self._history(query)
+        return {"page": page, "total": total, "capped": capped, "rows": [_row_dict(r) for r in rows]}
+
+    async def stats(self, params, body):
+        def frequency(manager):
+            return manager.store.card_frequency() if manager.store.exists() else []
+        return {"cards": [[card, count] for card, count in await self._history(frequency)]}
+
+    async def metrics(self, params, body):
+        result = {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected,
+            "endpoints": self.latency.summary(),
+            "api": self.reading_stats.summary(),
+        }
+        if self.cache:
+            result["cache"] = {"hits": self.cache.hits, "misses": self.cache.misses}
+        if METRICS_ENABLED:
+            result["instrumentation"] = snapshot()
+        return result
+
+    async def health(self, params, body):
+        return {"status": "ok"}
+
+    async def dispatch(self, method, target, body):
+        """Returns (status, payload, headers) for one request."""
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            return 404, {"error": f"Unknown path {url.path}"}, {}
+        if method != route[0]:
+            return 405, {"error": f"Use {route[0]} for {url.path}"}, {"Allow": route[0]}
+        # Monitoring endpoints bypass backpressure so they answer under load.
+        limited = url.path not in ("/metrics", "/health")
+        if limited and self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return 503, {"error": "Server busy, retry shortly"}, {"Retry-After": "1"}
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        start = time.perf_counter()
+        self.in_flight += limited
+        try:
+            payload = await asyncio.wait_for(route[1](params, body), self.timeout)
+            status = 200
+        except asyncio.TimeoutError:
+            status, payload = 504, {"error": f"Request took longer than {self.timeout}s"}
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= limited
+        self.latency.record(url.path, status, time.perf_counter() - start)
+        return status, payload, {}
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await _write_response(writer, e.status, {"error": str(e)}, {}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, raw_body = request
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    if not isinstance(body, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    status, payload, extra = 400, {"error": f"Invalid JSON body: {e}"}, {}
+                else:
+                    status, payload, extra = await self.dispatch(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _write_response(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        await self.client.close()
+        self.history_executor.submit(lambda: self._history_manager and self._history_manager.store.flush())
+        self.history_executor.shutdown(wait=True)
+        if self.cache:
+            self.cache_executor.submit(self.cache.close)
+        self.cache_executor.shutdown(wait=True)
+
+
+async def _read_request(reader):
+    """Reads one request; returns None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _write_response(writer, status, payload, headers, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+def _row_dict(row):
+    return {"datetime": row[0], "question": row[1], "cards": row[2], "reading": row[3]}
+
+
+async def serve(args):
+    client = openai.AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY") or ("stub" if args.base_url else None),
+        base_url=args.base_url,
+        max_retries=SERVER_API_MAX_RETRIES,
+        timeout=args.timeout,
+    )
+    cache = ReadingCache() if CACHE_ENABLED and not args.no_cache else None
+    service = TarotService(client, cache, args.max_in_flight, args.timeout, args.api_concurrency)
+    server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+    port = server.sockets[0].getsockname()[1]
+    print(f"Tarot service listening on http://{args.host}:{port}", flush=True)
+    # Stop cleanly on Ctrl+C or SIGTERM so buffered history rows are written.
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve draws, readings and history over HTTP.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="OpenAI-compatible endpoint, e.g. a local fake_openai.py")
+    parser.add_argument("--timeout", type=float, default=SERVER_REQUEST_TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=SERVER_MAX_IN_FLIGHT, help="requests handled at once before answering 503")
+    parser.add_argument("--api-concurrency", type=int, default=SERVER_API_CONCURRENCY, help="concurrent requests to the reading API")
+    parser.add_argument("--no-cache", action="store_true", help="always call the API instead of the reading cache")
+    args = parser.parse_args()
+
+    load_dotenv()
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
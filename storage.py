@@ -0,0 +1,696 @@
+import io
+import os
+import re
+import csv
+import mmap
+import sqlite3
+from datetime import datetime
+from collections import namedtuple
+
+from aggregates import CardFrequencyAggregate
+from log_writer import LogWriter, orphan_journals
+from config import (
+    HISTORY_BACKEND, HISTORY_CSV_PATH, HISTORY_DB_PATH, HISTORY_ROTATE, HISTORY_ROTATE_BYTES, SEARCH_COUNT_LIMIT,
+)
+from metrics import incr
+from segments import SegmentArchive
+
+HEADER = ["datetime", "question", "cards", "reading"]
+
+# A single page of history, newest first. total_pages is None when the
+# backend cannot tell without scanning the whole log.
+HistoryPage = namedtuple("HistoryPage", ["rows", "has_next", "total_pages"])
+
+# One page of full-text search results and the total number of matches. When
+# capped is True the backend stopped counting and total is a lower bound.
+SearchResults = namedtuple("SearchResults", ["rows", "total", "capped"], defaults=[False])
+
+
+# Every row written by log_reading starts with its timestamp, which lets us
+# find row boundaries by seeking backwards even though readings may contain
+# newlines inside quoted fields.
+ROW_START = re.compile(rb"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},")
+
+# Date searches for a prefix such as "2025" or "2025-08-14" can skip archived segments.
+DATE_PREFIX = re.compile(r"\d{4}(-\d{2}){0,2}$")
+
+
+def format_timestamp(when=None):
+    """Formats a datetime (default: now) the way the history log stores it."""
+    return (when or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_keywords(text):
+    """Splits a keyword query into lower-cased terms; "quoted text" stays one phrase."""
+    terms = []
+    for token in re.findall(r'"[^"]*"|\S+', text):
+        if token.startswith('"'):
+            phrase = " ".join(re.findall(r"\w+", token.lower()))
+            if phrase:
+                terms.append(phrase)
+        else:
+            terms.extend(re.findall(r"\w+", token.lower()))
+    return terms
+
+
+def date_range_end(date_to):
+    """Upper bound that makes a date prefix such as "2025-08" inclusive."""
+    return date_to + "\uffff"
+
+
+def split_cards(cards_field):
+    """Splits the comma-joined cards column into a list of card names."""
+    return [c.strip() for c in cards_field.split(",") if c.strip()]
+
+
+class ReversePaginator:
+    """Pages through a CSV log newest-first by seeking backwards from the end.
+
+    The file is memory-mapped and row starts are found with rfind, so only
+    the bytes of the requested page are touched. The byte offset where each
+    visited page begins is kept in a sparse index, so moving back and forth
+    between pages never rescans rows already seen. The index is dropped as
+    soon as the file changes size or mtime. The log is only ever appended to
+    or replaced by rename (see segments.py), never truncated, so the mapped
+    bytes stay valid while a page is read.
+    """
+    def __init__(self, file_path, page_size):
+        self.file_path = file_path
+        self.page_size = page_size
+        self._stamp = None
+        self._data_start = 0
+        # _page_ends[k] is the byte offset just past the newest row of page k.
+        self._page_ends = []
+
+    def _refresh(self, f, mm):
+        # Stat the open file: a rotation may have renamed a new log over the path.
+        st = os.fstat(f.fileno())
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._data_start = mm.find(b"\n") + 1 if len(mm) else 0
+            self._page_ends = [len(mm)]
+
+    def seekable(self):
+        """True if the first data row has the timestamp prefix we seek on."""
+        with open(self.file_path, "rb") as f:
+            f.readline()
+            return ROW_START.match(f.read(20)) is not None
+
+    def _row_start_before(self, mm, end):
+        """Returns the offset of the row ending at `end`."""
+        pos = end
+        while pos > self._data_start:
+            nl = mm.rfind(b"\n", self._data_start, pos - 1)
+            if nl < 0:
+                return self._data_start
+            if ROW_START.match(mm, nl + 1):
+                return nl + 1
+            pos = nl + 1
+        return self._data_start
+
+    def _page_start(self, mm, end):
+        start = end
+        for _ in range(self.page_size):
+            if start <= self._data_start:
+                break
+            start = self._row_start_before(mm, start)
+        return start
+
+    def read_page(self, page_number):
+        if os.path.getsize(self.file_path) == 0:
+            return HistoryPage([], False, None)
+        with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            self._refresh(f, mm)
+            # Walk forward from the last cached boundary if this page is new.
+            while len(self._page_ends) <= page_number + 1:
+                end = self._page_ends[-1]
+                if end <= self._data_start:
+                    break
+                self._page_ends.append(self._page_start(mm, end))
+            if page_number + 1 >= len(self._page_ends):
+                return HistoryPage([], False, None)
+            start, end = self._page_ends[page_number + 1], self._page_ends[page_number]
+            text = mm[start:end].decode("utf-8")
+        rows = [row for row in csv.reader(io.StringIO(text, newline="")) if row]
+        rows.reverse()
+        incr("history_rows_scanned", len(rows))
+        return HistoryPage(rows, start > self._data_start, None)
+
+
+class CSVHistoryStore:
+    """Append-only reading history kept in a single CSV file.
+
+    Writes go through a buffered, locked LogWriter; every read flushes it
+    first so the views always include this process's own readings. Older
+    rows can be rotated into compressed monthly segments (see segments.py);
+    reads stream the segments before the live log and skip segments whose
+    manifest entry rules them out.
+    """
+    def __init__(self, file_path=HISTORY_CSV_PATH):
+        self.file_path = file_path
+        self._paginator = None
+        self.aggregate = CardFrequencyAggregate(file_path)
+        self.archive = SegmentArchive(file_path, HEADER)
+        self._writer = None
+
+    @property
+    def writer(self):
+        # Created on first use so read-only commands never touch journals.
+        if self._writer is None:
+            self._writer = LogWriter(self.file_path, HEADER, on_flush=self._flushed)
+        return self._writer
+
+    def _flushed(self):
+        self.aggregate.sync()
+        if HISTORY_ROTATE and self._rotation_due(HISTORY_ROTATE, HISTORY_ROTATE_BYTES):
+            self.rotate(HISTORY_ROTATE, HISTORY_ROTATE_BYTES)
+
+    def _rotation_due(self, by, max_bytes):
+        """Cheap check before taking the lock: log too big, or its oldest row from a past month."""
+        if by == "size":
+            return os.path.getsize(self.file_path) > max_bytes
+        with open(self.file_path, "rb") as f:
+            f.readline()
+            first = f.read(7).decode("utf-8", "replace")
+        return bool(first) and first < format_timestamp()[:7]
+
+    def rotate(self, by="size", max_bytes=HISTORY_ROTATE_BYTES):
+        """Moves rows from the live log into compressed segments. Returns the number archived."""
+        self.flush()
+        # Journal recovery only looks for already-applied rows at the end of the
+        # live log, so replay crashed writers' journals before rows move out of it.
+        self.writer.recover()
+        archived = self.archive.rotate(by, max_bytes)
+        if archived:
+            self.aggregate.sync()
+        return archived
+
+    def compact(self):
+        """Merges archived segments of the same month. Returns the number of segments removed."""
+        return self.archive.compact()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+        elif orphan_journals(self.file_path):
+            # Opening a writer replays journals of crashed processes into the log.
+            self.writer.flush()
+
+    def exists(self):
+        self.flush()
+        return os.path.isfile(self.file_path) or bool(self.archive.load().segments)
+
+    def append(self, timestamp, question, cards, reading):
+        """Queues one reading for the log; the header is written when the file is new."""
+        self.writer.write([timestamp, question, ", ".join(cards), reading])
+
+    def _live_rows(self):
+        if not os.path.isfile(self.file_path):
+            return
+        scanned = 0
+        try:
+            with open(self.file_path, mode="r", newline='', encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    if row:
+                        scanned += 1
+                        yield row
+        finally:
+            incr("history_rows_scanned", scanned)
+
+    def iter_rows(self, date_from="", date_to="", card=""):
+        """Yields every reading row, oldest first, without loading the file.
+
+        The filters only skip archived segments that cannot contain matching
+        rows; callers still filter the rows themselves.
+        """
+        if not self.exists():
+            return
+        yield from self.archive.load().iter_rows(date_from, date_to, card)
+        yield from self._live_rows()
+
+    def is_empty(self):
+        return next(self.iter_rows(), None) is None
+
+    def count(self):
+        self.flush()
+        return self.archive.load().rows + sum(1 for _ in self._live_rows())
+
+    def _read_live_page(self, page_number, page_size):
+        if not os.path.isfile(self.file_path):
+            return HistoryPage([], False, 0)
+        if self._paginator is None or self._paginator.page_size != page_size:
+            self._paginator = ReversePaginator(self.file_path, page_size)
+        if self._paginator.seekable():
+            return self._paginator.read_page(page_number)
+        # Logs edited by hand may not start rows with a timestamp; scan them.
+        rows = list(self._live_rows())
+        total_pages = (len(rows) + page_size - 1) // page_size
+        end = len(rows) - page_number * page_size
+        start = max(end - page_size, 0)
+        page_rows = list(reversed(rows[start:max(end, 0)]))
+        return HistoryPage(page_rows, page_number < total_pages - 1, total_pages)
+
+    def read_page(self, page_number, page_size):
+        """Returns one page of rows, newest first, reading only that page from disk.
+
+        Pages past the live log continue into the archive, newest segment
+        first; segments before the requested page are skipped by row count.
+        """
+        self.flush()
+        archived = self.archive.load().rows
+        page = self._read_live_page(page_number, page_size)
+        if not archived:
+            return page
+        if len(page.rows) == page_size and page.has_next:
+            return HistoryPage(page.rows, True, None)
+        start = page_number * page_size
+        live = start + len(page.rows) if page.rows else sum(1 for _ in self._live_rows())
+        rows = page.rows + self.archive.rows_newest_first(max(0, start - live), page_size - len(page.rows))
+        total = live + archived
+        return HistoryPage(rows, start + page_size < total, (total + page_size - 1) // page_size)
+
+    def search(self, filter_type, term):
+        """Returns rows matching a date, question or card substring."""
+        term = term.strip()
+        if filter_type == "date":
+            rows = self.iter_rows(term, term) if DATE_PREFIX.match(term) else self.iter_rows()
+            return [r for r in rows if term in r[0]]
+        if filter_type == "question":
+            term = term.lower()
+            return [r for r in self.iter_rows() if term in r[1].lower()]
+        if filter_type == "card":
+            term = term.lower()
+            return [r for r in self.iter_rows(card=term) if term in r[2].lower()]
+        return list(self.iter_rows())
+
+    def query(self, keywords="", card="", date_from="", date_to="", page_number=0, page_size=10):
+        """Keyword search over question and reading text combined with card and date filters.
+
+        The CSV log has no index, so this scans every row of the live log and
+        of the archived segments that can match; use the SQLite backend for
+        indexed search on large histories. Rows are ranked by how often the
+        terms occur, newest first on ties.
+        """
+        # Whole tokens only, as FTS5 matches them: "art" does not match "heart".
+        patterns = [re.compile(rf"\b{re.escape(term)}\b") for term in parse_keywords(keywords)]
+        card = card.strip().lower()
+        matches = []
+        for index, row in enumerate(self.iter_rows(date_from, date_to, card)):
+            if date_from and row[0] < date_from:
+                continue
+            if date_to and row[0] >= date_range_end(date_to):
+                continue
+            if card and card not in row[2].lower():
+                continue
+            text = " ".join(re.findall(r"\w+", f"{row[1]} {row[3]}".lower()))
+            score = 0
+            for pattern in patterns:
+                hits = len(pattern.findall(text))
+                if not hits:
+                    break
+                score += hits
+            else:
+                matches.append((-score, -index, row))
+        matches.sort(key=lambda m: m[:2])
+        start = page_number * page_size
+        return SearchResults([m[2] for m in matches[start:start + page_size]], len(matches))
+
+    def card_frequency(self):
+        """Returns (card, count) pairs, most drawn first, from the aggregate and the segment manifest."""
+        self.flush()
+        counts = self.aggregate.sync()
+        counts.update(self.archive.load().card_counts())
+        return counts.most_common()
+
+    def clear(self):
+        if self._writer is not None:
+            self._writer.discard()
+        if os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+        self.aggregate.clear()
+        self.archive.clear()
+
+
+class SQLiteHistoryStore:
+    """Reading history in SQLite, indexed by datetime and by card.
+
+    Cards are normalized into their own table so card searches and the
+    frequency table are answered from indexes instead of re-parsing rows.
+    Question and reading text are indexed with FTS5 for ranked keyword search
+    when the SQLite build supports it.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS readings (
+            id INTEGER PRIMARY KEY,
+            datetime TEXT NOT NULL,
+            question TEXT NOT NULL,
+            cards TEXT NOT NULL,
+            reading TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_readings_datetime ON readings (datetime);
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS reading_cards (
+            reading_id INTEGER NOT NULL REFERENCES readings (id),
+            card_id INTEGER NOT NULL REFERENCES cards (id),
+            PRIMARY KEY (card_id, reading_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS card_counts (
+            card_id INTEGER PRIMARY KEY REFERENCES cards (id),
+            draws INTEGER NOT NULL
+        );
+    """
+
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS readings_fts USING fts5 (
+            question, reading, content='readings', content_rowid='id'
+        );
+    """
+
+    def __init__(self, file_path=HISTORY_DB_PATH):
+        self.file_path = file_path
+        self._conn = None
+        self._card_ids = {}
+        self._count = None
+        self.fts = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.file_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+            self._backfill_card_counts()
+            self._setup_fts()
+        return self._conn
+
+    def _setup_fts(self):
+        """Creates the full-text index, indexing existing rows the first time."""
+        conn = self._conn
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: keyword search falls back to scanning.
+            self.fts = False
+            return
+        self.fts = True
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            with conn:
+                conn.execute("INSERT INTO readings_fts (readings_fts) VALUES ('rebuild')")
+                conn.execute("PRAGMA user_version = 1")
+
+    def _backfill_card_counts(self):
+        """Builds card_counts for databases created before it was maintained on write."""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM card_counts LIMIT 1").fetchone() is None:
+            with conn:
+                conn.execute(
+                    "INSERT INTO card_counts (card_id, draws) "
+                    "SELECT card_id, COUNT(*) FROM reading_cards GROUP BY card_id"
+                )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def exists(self):
+        return os.path.isfile(self.file_path)
+
+    def _card_id(self, name):
+        card_id = self._card_ids.get(name)
+        if card_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO cards (name) VALUES (?)", (name,))
+            card_id = self.conn.execute("SELECT id FROM cards WHERE name = ?", (name,)).fetchone()[0]
+            self._card_ids[name] = card_id
+        return card_id
+
+    def _matching_card_ids(self, term):
+        """Ids of the cards whose name contains `term`, looked up in the small cards table.
+
+        Filtering reading_cards on these ids uses its (card_id, reading_id)
+        key instead of scanning every reading's cards.
+        """
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM cards WHERE instr(lower(name), ?) > 0", (term.strip().lower(),)
+        )]
+
+    def _insert(self, timestamp, question, cards, reading):
+        cur = self.conn.execute(
+            "INSERT INTO readings (datetime, question, cards, reading) VALUES (?, ?, ?, ?)",
+            (timestamp, question, ", ".join(cards), reading),
+        )
+        if self.fts:
+            self.conn.execute(
+                "INSERT INTO readings_fts (rowid, question, reading) VALUES (?, ?, ?)",
+                (cur.lastrowid, question, reading),
+            )
+        # A card can appear twice in the cards column of an imported row.
+        card_ids = {self._card_id(card) for card in cards}
+        self.conn.executemany(
+            "INSERT INTO reading_cards (reading_id, card_id) VALUES (?, ?)",
+            [(cur.lastrowid, card_id) for card_id in card_ids],
+        )
+        self.conn.executemany(
+            "INSERT INTO card_counts (card_id, draws) VALUES (?, 1) "
+            "ON CONFLICT (card_id) DO UPDATE SET draws = draws + 1",
+            [(card_id,) for card_id in card_ids],
+        )
+
+    def append(self, timestamp, question, cards, reading):
+        """Appends one reading; existing rows are never rewritten."""
+        with self.conn:
+            self._insert(timestamp, question, cards, reading)
+
+    def iter_rows(self):
+        if not self.exists():
+            return
+        cur = self.conn.execute("SELECT datetime, question, cards, reading FROM readings ORDER BY id")
+        scanned = 0
+        try:
+            for row in cur:
+                scanned += 1
+                yield list(row)
+        finally:
+            incr("history_rows_scanned", scanned)
+
+    def is_empty(self):
+        if not self.exists():
+            return True
+        return self.conn.execute("SELECT 1 FROM readings LIMIT 1").fetchone() is None
+
+    def count(self):
+        if not self.exists():
+            return 0
+        # Rows are only ever appended (clear deletes the database), so the
+        # count can only change when MAX(id), an index lookup, does.
+        max_id = self.conn.execute("SELECT MAX(id) FROM readings").fetchone()[0]
+        if self._count is None or self._count[0] != max_id:
+            self._count = (max_id, self.conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0])
+        return self._count[1]
+
+    def read_page(self, page_number, page_size):
+        # Fetch one extra row so we know whether a next page exists.
+        rows = self.conn.execute(
+            "SELECT datetime, question, cards, reading FROM readings "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            (page_size + 1, page_number * page_size),
+        ).fetchall()
+        total_pages = (self.count() + page_size - 1) // page_size
+        incr("history_rows_scanned", len(rows))
+        return HistoryPage([list(r) for r in rows[:page_size]], len(rows) > page_size, total_pages)
+
+    def search(self, filter_type, term):
+        term = term.strip()
+        select = "SELECT datetime, question, cards, reading FROM readings"
+        if filter_type == "date":
+            if term[:4].isdigit():
+                # Date prefixes such as "2025-08" become an indexed range scan.
+                cur = self.conn.execute(
+                    f"{select} WHERE datetime >= ? AND datetime < ? ORDER BY id",
+                    (term, term + "\uffff"),
+                )
+            else:
+                cur = self.conn.execute(f"{select} WHERE instr(datetime, ?) > 0 ORDER BY id", (term,))
+        elif filter_type == "question":
+            cur = self.conn.execute(
+                f"{select} WHERE instr(lower(question), ?) > 0 ORDER BY id", (term.lower(),)
+            )
+        elif filter_type == "card":
+            card_ids = self._matching_card_ids(term)
+            if not card_ids:
+                return []
+            cur = self.conn.execute(
+                f"{select} WHERE id IN (SELECT reading_id FROM reading_cards "
+                f"WHERE card_id IN ({', '.join('?' * len(card_ids))})) ORDER BY id",
+                card_ids,
+            )
+        else:
+            cur = self.conn.execute(f"{select} ORDER BY id")
+        rows = [list(r) for r in cur]
+        # The indexes skip non-matching rows, so only the matches are read.
+        incr("history_rows_scanned", len(rows))
+        return rows
+
+    def query(self, keywords="", card="", date_from="", date_to="", page_number=0, page_size=10):
+        """Ranked keyword/phrase search over question and reading text.
+
+        Keywords are matched through the FTS5 index and ranked with bm25; the
+        card and date range filters use the card and datetime indexes. Without
+        keywords, matches are returned newest first. A date range is first
+        turned into a rowid range so the full-text index only visits readings
+        inside it. Matches are counted up to SEARCH_COUNT_LIMIT (or just past
+        the requested page); beyond that `capped` is set and only the newest
+        matches up to that limit are ranked.
+        """
+        terms = parse_keywords(keywords)
+        use_fts = bool(terms) and self.fts
+        where, params = [], []
+        if date_from or date_to:
+            bounds = self.conn.execute(
+                "SELECT MIN(id), MAX(id) FROM readings WHERE datetime >= ? AND datetime < ?",
+                (date_from, date_range_end(date_to) if date_to else "\uffff"),
+            ).fetchone()
+            if bounds[0] is None:
+                return SearchResults([], 0)
+            where.append(f"{'f.rowid' if use_fts else 'r.id'} BETWEEN ? AND ?")
+            params.extend(bounds)
+        if date_from:
+            where.append("r.datetime >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("r.datetime < ?")
+            params.append(date_range_end(date_to))
+        if card.strip():
+            card_ids = self._matching_card_ids(card)
+            if not card_ids:
+                return SearchResults([], 0)
+            # Probe the (card_id, reading_id) key per candidate; with the capped
+            # count and newest-first order only a bounded number are visited.
+            where.append(
+                "EXISTS (SELECT 1 FROM reading_cards rc "
+                f"WHERE rc.card_id IN ({', '.join('?' * len(card_ids))}) AND rc.reading_id = r.id)"
+            )
+            params.extend(card_ids)
+
+        source = "readings r"
+        order = "r.id DESC"
+        if use_fts:
+            source = "readings_fts f JOIN readings r ON r.id = f.rowid"
+            where.append("readings_fts MATCH ?")
+            params.append(" ".join('"' + term + '"' for term in terms))
+            order = "f.rank, r.id DESC"
+        elif terms:
+            for term in terms:
+                where.append("instr(lower(r.question || ' ' || r.reading), ?) > 0")
+                params.append(term)
+
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        # Always count past the requested page so callers know whether a next page exists.
+        limit = max(SEARCH_COUNT_LIMIT, (page_number + 1) * page_size)
+        total = self.conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {source}{clause} LIMIT ?)", params + [limit + 1]
+        ).fetchone()[0]
+        if use_fts and total > limit:
+            # Too many matches to rank them all with bm25: rank the newest `limit`.
+            floor = self.conn.execute(
+                f"SELECT f.rowid FROM {source}{clause} ORDER BY f.rowid DESC LIMIT 1 OFFSET ?",
+                params + [limit - 1],
+            ).fetchone()[0]
+            clause += " AND f.rowid >= ?"
+            params.append(floor)
+        rows = self.conn.execute(
+            f"SELECT r.datetime, r.question, r.cards, r.reading FROM {source}{clause} "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [page_size, page_number * page_size],
+        ).fetchall()
+        # The count visits every match up to the cap; the page reads are among them.
+        incr("history_rows_scanned", min(total, limit + 1))
+        return SearchResults([list(r) for r in rows], min(total, limit), total > limit)
+
+    def card_frequency(self):
+        return self.conn.execute(
+            "SELECT c.name, cc.draws FROM card_counts cc JOIN cards c ON c.id = cc.card_id "
+            "ORDER BY cc.draws DESC, c.name"
+        ).fetchall()
+
+    def clear(self):
+        self.close()
+        os.remove(self.file_path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.isfile(self.file_path + suffix):
+                os.remove(self.file_path + suffix)
+        self._card_ids = {}
+        self._count = None
+
+    def import_csv(self, csv_path, batch_size=10000):
+        """Imports an existing CSV log in batched transactions. Returns the row count."""
+        imported = 0
+        rows = CSVHistoryStore(csv_path).iter_rows()
+        while True:
+            with self.conn:
+                n = 0
+                for row in rows:
+                    self._insert(row[0], row[1], split_cards(row[2]), row[3])
+                    n += 1
+                    if n == batch_size:
+                        break
+            imported += n
+            if n < batch_size:
+                return imported
+
+
+def create_store(backend=None, file_path=None):
+    """Builds the history store named by `backend` (defaults to config/env)."""
+    backend = backend or os.getenv("TAROT_HISTORY_BACKEND", HISTORY_BACKEND)
+    if backend == "csv":
+        return CSVHistoryStore(file_path or HISTORY_CSV_PATH)
+    if backend == "sqlite":
+        return SQLiteHistoryStore(file_path or HISTORY_DB_PATH)
+    raise ValueError(f"Unknown history backend: {backend}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Tarot history storage tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a CSV reading log into the SQLite store.")
+    imp.add_argument("csv_path", nargs="?", default=HISTORY_CSV_PATH)
+    imp.add_argument("--db", default=HISTORY_DB_PATH)
+    rot = sub.add_parser("rotate", help="Move rows from the CSV log into compressed monthly segments.")
+    rot.add_argument("csv_path", nargs="?", default=HISTORY_CSV_PATH)
+    rot.add_argument("--by", choices=["size", "month"], default="month",
+                     help="size: archive everything once the log exceeds --max-mb; month: archive past months")
+    rot.add_argument("--max-mb", type=float, default=HISTORY_ROTATE_BYTES / (1024 * 1024))
+    comp = sub.add_parser("compact", help="Merge archived segments of the same month.")
+    comp.add_argument("csv_path", nargs="?", default=HISTORY_CSV_PATH)
+    seg = sub.add_parser("segments", help="List archived segments.")
+    seg.add_argument("csv_path", nargs="?", default=HISTORY_CSV_PATH)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        store = SQLiteHistoryStore(args.db)
+        count = store.import_csv(args.csv_path)
+        store.close()
+        print(f"Imported {count} readings from {args.csv_path} into {args.db}.")
+    elif args.command == "rotate":
+        count = CSVHistoryStore(args.csv_path).rotate(args.by, int(args.max_mb * 1024 * 1024))
+        print(f"Archived {count} readings from {args.csv_path}.")
+    elif args.command == "compact":
+        removed = CSVHistoryStore(args.csv_path).compact()
+        print(f"Merged segments; {removed} fewer segment files.")
+    elif args.command == "segments":
+        archive = CSVHistoryStore(args.csv_path).archive.load()
+        for segment in archive.segments:
+            print(f"{segment['file']}: {segment['rows']} readings, {segment['first']} .. {segment['last']}, "
+                  f"{segment['bytes'] / 1024:.1f} KiB")
+        print(f"{len(archive.segments)} segments, {archive.rows} readings archived.")
+
+
+if __name__ == "__main__":
+    main()